@@ -0,0 +1,72 @@
+"""Benchmark the splash GIF: decoding the first frame against every frame.
+
+LoadingScreen used to decode every frame of loading.gif before the splash
+could draw; it now decodes the first frame and the rest one at a time as
+they are shown. This times both ways of starting up and measures their
+memory. tracemalloc only sees Python's own allocations, not Pillow's pixel
+buffers, so the decoded pixel bytes still held afterwards are reported too.
+
+    python bench_loading_gif.py [path/to/file.gif]
+"""
+import sys
+import time
+import tracemalloc
+
+from PIL import Image
+
+
+GIF_PATH = 'loading.gif'
+REPEATS = 20
+
+
+def first_frame(path):
+    """What LoadingScreen does before the splash appears."""
+    gif = Image.open(path)
+    gif.n_frames  # read for the animation, which walks the frame headers
+    frames = [gif.copy()]
+    gif.close()
+    return frames
+
+
+def every_frame(path):
+    """What LoadingScreen used to do: every frame decoded up front."""
+    gif = Image.open(path)
+    frames = []
+    for frame in range(gif.n_frames):
+        gif.seek(frame)
+        frames.append(gif.copy())
+    gif.close()
+    return frames
+
+
+def pixel_bytes(frames):
+    return sum(frame.width * frame.height * len(frame.getbands()) for frame in frames)
+
+
+def measure(decode, path):
+    decode(path)
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        decode(path)
+    ms = (time.perf_counter() - started) / REPEATS * 1000
+
+    tracemalloc.start()
+    frames = decode(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(frames), ms, peak, pixel_bytes(frames)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else GIF_PATH
+    with Image.open(path) as gif:
+        print(f"{path}: {gif.n_frames} frames of {gif.width}x{gif.height}")
+
+    print(f"{'decode':>12} {'frames':>7} {'ms':>8} {'traced KiB':>11} {'pixel KiB':>10}")
+    for label, decode in (("first frame", first_frame), ("every frame", every_frame)):
+        frames, ms, peak, pixels = measure(decode, path)
+        print(f"{label:>12} {frames:>7} {ms:>8.2f} {peak / 1024:>11.1f} {pixels / 1024:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark suggest_slots: 50 instructors over 3 months, target under 50 ms.
+
+Seeds a temporary database where each instructor is 80% booked (four
+two-hour lessons in a ten hour day) on working days for the next 90 days,
+then times suggesting the first five free slots for every instructor, with
+and without a student's lessons to avoid as well.
+
+    python bench_scheduling.py
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from database import Database, create_tables, migrate
+from scheduling import LESSON_INSERT, WORKING_DAYS, lesson_interval, suggest_slots
+
+
+INSTRUCTORS = 50
+STUDENTS = 500
+DAYS = 90
+LESSONS_PER_DAY = 4  # of two hours each: 8 of the 10 working hours booked
+REPEATS = 20
+TARGET_MS = 50
+
+
+def seed(db, first_day):
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO students (first_name, last_name, email, phone) VALUES (?, ?, ?, ?)",
+            [(f"Student{n}", "Test", f"s{n}@example.com", f"07{n:09d}") for n in range(STUDENTS)]
+        )
+        cursor.executemany(
+            "INSERT INTO instructors (first_name, last_name, license) VALUES (?, ?, ?)",
+            [(f"Instructor{n}", "Test", f"LIC{n}") for n in range(INSTRUCTORS)]
+        )
+
+        lessons = []
+        for offset in range(DAYS):
+            day = first_day + timedelta(days=offset)
+            if day.weekday() not in WORKING_DAYS:
+                continue
+            for instructor_id in range(1, INSTRUCTORS + 1):
+                # Two-hour lessons at distinct even hours, so none overlap
+                for hour in random.sample(range(8, 18, 2), LESSONS_PER_DAY):
+                    start, end = lesson_interval(day, f"{hour:02d}:00", 2)
+                    lessons.append((random.randint(1, STUDENTS), instructor_id, 'Standard', start[:10], start, end, 2, 'Booked', 90))
+        cursor.executemany(LESSON_INSERT, lessons)
+    return len(lessons)
+
+
+def timed(run):
+    run()
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        run()
+    return (time.perf_counter() - started) / REPEATS * 1000
+
+
+def main():
+    random.seed(1)
+    first_day = date(2030, 1, 7)
+    now = datetime.combine(first_day, datetime.min.time())
+    instructor_ids = list(range(1, INSTRUCTORS + 1))
+
+    with tempfile.TemporaryDirectory() as folder:
+        db = Database(os.path.join(folder, 'bench.db'))
+        create_tables(db)
+        migrate(db.conn)
+        lessons = seed(db, first_day)
+        print(f"{INSTRUCTORS} instructors, {lessons} lessons over {DAYS} days")
+
+        for label, student_id in (("instructors only", None), ("with a student", 1)):
+            ms = timed(lambda: suggest_slots(db, instructor_ids, 2, first_day, days=DAYS, student_id=student_id, now=now))
+            verdict = "ok" if ms < TARGET_MS else f"over the {TARGET_MS} ms target"
+            print(f"{label:>17}: {ms:.1f} ms ({verdict})")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
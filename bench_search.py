@@ -0,0 +1,75 @@
+"""Benchmark student search: the FTS5 indexes against the LIKE scan they replaced.
+
+Seeds 100k synthetic students in a temporary database, builds the search
+indexes, then times search() and like_search() for the same terms.
+
+    python bench_search.py
+"""
+import os
+import random
+import string
+import tempfile
+import time
+
+from database import Database, create_tables, migrate
+from search import RESULT_COLUMNS, create_search_index, like_search, search
+
+
+STUDENTS = 100_000
+REPEATS = 20
+TERMS = ('mart', 'jo', 'smith', 'gmail.com', '0791')
+
+FIRST_NAMES = ['James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Martin', 'Linda', 'David', 'Sarah']
+LAST_NAMES = ['Smith', 'Jones', 'Taylor', 'Brown', 'Williams', 'Wilson', 'Johnson', 'Davies', 'Martinez', 'Evans']
+DOMAINS = ['gmail.com', 'outlook.com', 'example.co.uk']
+
+
+def seed(db):
+    def random_word(length):
+        return ''.join(random.choices(string.ascii_lowercase, k=length))
+
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO students (first_name, last_name, email, phone) VALUES (?, ?, ?, ?)",
+            [
+                (
+                    random.choice(FIRST_NAMES) + random_word(3),
+                    random.choice(LAST_NAMES),
+                    f"{random_word(8)}{n}@{random.choice(DOMAINS)}",
+                    f"07{n:09d}",
+                )
+                for n in range(STUDENTS)
+            ]
+        )
+
+
+def timed(run):
+    rows = run()
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        run()
+    return len(rows), (time.perf_counter() - started) / REPEATS * 1000
+
+
+def main():
+    random.seed(1)
+    columns = ', '.join(f"t.{column}" for column in RESULT_COLUMNS['students'])
+    with tempfile.TemporaryDirectory() as folder:
+        db = Database(os.path.join(folder, 'bench.db'))
+        create_tables(db)
+        migrate(db.conn)
+        seed(db)
+        if not create_search_index(db.conn):
+            print("This SQLite build has no FTS5")
+            return
+
+        print(f"{'term':>10} {'rows':>6} {'fts ms':>8} {'like ms':>8}")
+        for term in TERMS:
+            rows, fts_ms = timed(lambda: search(db, 'students', term))
+            _, like_ms = timed(lambda: like_search(db, 'students', columns, term.split()))
+            print(f"{term:>10} {rows:>6} {fts_ms:>8.2f} {like_ms:>8.2f}")
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark loading one timetable day: the joined query against the old lookups.
+
+The old code ran one query for the day's lessons, then a student and an
+instructor name lookup per card (1 + 2N queries). fetch_lesson_cards()
+runs one joined query. Each size is a day with that many lessons in a
+table of a year's lessons at the same rate.
+
+    python bench_timetable.py
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from database import Database, create_tables, migrate
+from timetable import fetch_lesson_cards
+
+
+SIZES = (10, 100, 1000)
+DAYS = 365
+PEOPLE = 200
+REPEATS = 20
+
+
+def seed(db, lessons_per_day):
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO students (first_name, last_name, email, phone) VALUES (?, ?, ?, ?)",
+            [(f"Student{n}", "Test", f"s{n}@example.com", f"0{n:010d}") for n in range(PEOPLE)]
+        )
+        cursor.executemany(
+            "INSERT INTO instructors (first_name, last_name, license) VALUES (?, ?, ?)",
+            [(f"Instructor{n}", "Test", f"LIC{n}") for n in range(PEOPLE)]
+        )
+        first_day = date(2025, 1, 1)
+        cursor.executemany('''
+            INSERT INTO lessons
+                (student_id, instructor_id, lesson_type, lesson_date, start_time, end_time, duration, status, fee)
+            VALUES (?, ?, 'Standard', ?, ?, ?, 1, 'Booked', 45)
+        ''', [
+            (random.randint(1, PEOPLE), random.randint(1, PEOPLE), day, f"{day} 09:00", f"{day} 10:00")
+            for offset in range(DAYS)
+            for day in [(first_day + timedelta(days=offset)).isoformat()]
+            for _ in range(lessons_per_day)
+        ])
+
+
+def old_lookups(db, day):
+    # The code replaced by fetch_lesson_cards
+    cursor = db.cursor()
+    cursor.execute("SELECT * FROM lessons WHERE date(lesson_date) = date(?) ORDER BY lesson_type", (day,))
+    columns = [column[0] for column in cursor.description]
+    cards = []
+    for row in cursor.fetchall():
+        lesson = dict(zip(columns, row))
+        cursor.execute("SELECT first_name || ' ' || last_name FROM students WHERE id = ?", (lesson['student_id'],))
+        student = cursor.fetchone()[0]
+        cursor.execute("SELECT first_name || ' ' || last_name FROM instructors WHERE id = ?", (lesson['instructor_id'],))
+        instructor = cursor.fetchone()[0]
+        cards.append((lesson, student, instructor))
+    return cards
+
+
+def measure(db, load, day):
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    load(db, day)
+    db.conn.set_trace_callback(None)
+
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        load(db, day)
+    return len(statements), (time.perf_counter() - started) / REPEATS * 1000
+
+
+def main():
+    random.seed(1)
+    print(f"{'lessons/day':>11} {'method':>8} {'queries':>8} {'ms':>8}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as folder:
+            db = Database(os.path.join(folder, 'bench.db'))
+            create_tables(db)
+            migrate(db.conn)
+            seed(db, size)
+            for name, load in (('old', old_lookups), ('joined', lambda db, day: fetch_lesson_cards(db.cursor(), day))):
+                queries, ms = measure(db, load, '2025-06-02')
+                print(f"{size:>11} {name:>8} {queries:>8} {ms:>8.2f}")
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark refreshing a paged tree: clear-and-reinsert against diffing.
+
+For each table size, a refresh finds 1% of rows changed, 10 added and 10
+removed. The script reports how many Treeview operations each approach
+issues and how long diff_rows() takes. When a display is available, both
+approaches are also timed against a real ttk.Treeview in a withdrawn window.
+
+    python bench_treediff.py
+"""
+import random
+import time
+
+from treediff import diff_rows
+
+
+SIZES = (1_000, 10_000, 50_000)
+CHANGED = 0.01
+ADDED = REMOVED = 10
+COLUMNS = ('id', 'first_name', 'last_name', 'email', 'phone')
+
+
+def make_rows(count):
+    return [(n, f"First{n}", f"Last{n}", f"user{n}@example.com", f"07{n:09d}") for n in range(1, count + 1)]
+
+
+def refreshed(rows):
+    """The rows as a later read would return them."""
+    rows = list(rows)
+    for index in random.sample(range(len(rows)), int(len(rows) * CHANGED)):
+        row = rows[index]
+        rows[index] = row[:3] + (f"changed{row[0]}@example.com",) + row[4:]
+    for index in sorted(random.sample(range(len(rows)), REMOVED), reverse=True):
+        del rows[index]
+    next_id = rows[-1][0] + 1
+    rows.extend(make_rows(next_id + ADDED - 1)[next_id - 1:])
+    return rows
+
+
+def time_diff(rows, new_rows):
+    items = {str(row[0]): tuple(str(value) for value in row) for row in rows}
+    started = time.perf_counter()
+    diff = diff_rows(items, new_rows)
+    return diff, (time.perf_counter() - started) * 1000
+
+
+def time_treeview(root, rows, new_rows):
+    from tkinter import ttk
+
+    def fill():
+        tree = ttk.Treeview(root, columns=COLUMNS, show='headings')
+        for row in rows:
+            tree.insert('', 'end', iid=str(row[0]), values=row)
+        return tree
+
+    tree = fill()
+    started = time.perf_counter()
+    tree.delete(*tree.get_children())
+    for row in new_rows:
+        tree.insert('', 'end', iid=str(row[0]), values=row)
+    reinsert_ms = (time.perf_counter() - started) * 1000
+    tree.destroy()
+
+    # The same steps as LazyTree.apply_rows
+    tree = fill()
+    started = time.perf_counter()
+    items = {iid: tree.item(iid, 'values') for iid in tree.get_children()}
+    diff = diff_rows(items, new_rows)
+    if diff.stale:
+        tree.delete(*diff.stale)
+    for index, iid, values in diff.inserts:
+        tree.insert('', index, iid=iid, values=values)
+    for iid, values in diff.updates:
+        tree.item(iid, values=values)
+    diff_ms = (time.perf_counter() - started) * 1000
+    tree.destroy()
+    return reinsert_ms, diff_ms
+
+
+def main():
+    random.seed(1)
+    try:
+        import tkinter
+        root = tkinter.Tk()
+        root.withdraw()
+    except Exception as e:
+        print(f"No Treeview timings ({e})")
+        root = None
+
+    print(f"{'rows':>7} {'reinsert ops':>13} {'diff ops':>9} {'diff_rows ms':>13}", end='')
+    print(f" {'reinsert ms':>12} {'diff ms':>8}" if root else '')
+    for size in SIZES:
+        rows = make_rows(size)
+        new_rows = refreshed(rows)
+        diff, diff_rows_ms = time_diff(rows, new_rows)
+        reinsert_ops = len(rows) + len(new_rows)
+        diff_ops = len(diff.stale) + len(diff.inserts) + len(diff.updates)
+        print(f"{size:>7} {reinsert_ops:>13} {diff_ops:>9} {diff_rows_ms:>13.2f}", end='')
+        if root:
+            reinsert_ms, diff_ms = time_treeview(root, rows, new_rows)
+            print(f" {reinsert_ms:>12.1f} {diff_ms:>8.1f}")
+        else:
+            print()
+
+    if root:
+        root.destroy()
+
+
+if __name__ == '__main__':
+    main()
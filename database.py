@@ -0,0 +1,453 @@
+"""Connection management and schema migrations for driving_school.db."""
+import itertools
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from diagnostics import cursor_factory
+
+
+DB_PATH = 'driving_school.db'
+
+# Applied once when the shared connection is opened
+CONNECTION_PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -16000",  # negative means KiB, so about 16 MB of page cache
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 5000",  # the GUI and worker connections wait on each other's locks
+]
+
+# Compiled statements kept per connection, so repeated queries skip the parser
+STATEMENT_CACHE_SIZE = 256
+
+
+# The tables as the app first created them; MIGRATIONS takes them from there
+TABLES = [
+    '''
+    CREATE TABLE IF NOT EXISTS students (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT,
+        last_name TEXT,
+        email TEXT,
+        phone TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS instructors (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        first_name TEXT,
+        last_name TEXT,
+        email TEXT,
+        phone TEXT,
+        license TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS lessons (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER,
+        instructor_id INTEGER,
+        lesson_type TEXT,
+        lesson_date TEXT,
+        duration INTEGER,
+        status TEXT,
+        fee REAL,
+        FOREIGN KEY (student_id) REFERENCES students (id),
+        FOREIGN KEY (instructor_id) REFERENCES instructors (id)
+    )
+    ''',
+]
+
+
+# Each entry upgrades the schema by one version; PRAGMA user_version records
+# how many have been applied, so only the missing ones run on startup.
+MIGRATIONS = [
+    # 1: canonical ISO lesson dates and indexes for the date range queries
+    '''
+    UPDATE lessons SET lesson_date = date(lesson_date)
+    WHERE date(lesson_date) IS NOT NULL AND lesson_date <> date(lesson_date);
+    CREATE INDEX IF NOT EXISTS idx_lessons_date ON lessons (lesson_date);
+    CREATE INDEX IF NOT EXISTS idx_lessons_student_date ON lessons (student_id, lesson_date);
+    CREATE INDEX IF NOT EXISTS idx_lessons_instructor_date ON lessons (instructor_id, lesson_date);
+    ''',
+    # 2: lesson start/end times, with existing lessons placed at 09:00
+    '''
+    ALTER TABLE lessons ADD COLUMN start_time TEXT;
+    ALTER TABLE lessons ADD COLUMN end_time TEXT;
+    UPDATE lessons SET
+        start_time = lesson_date || ' 09:00',
+        end_time = strftime('%Y-%m-%d %H:%M', lesson_date || ' 09:00', '+' || duration || ' hours');
+    CREATE INDEX IF NOT EXISTS idx_lessons_instructor_start ON lessons (instructor_id, start_time);
+    CREATE INDEX IF NOT EXISTS idx_lessons_student_start ON lessons (student_id, start_time);
+    ''',
+    # 3: revenue and hours totals for the reports, kept up to date by
+    # triggers so reading them never scans lessons
+    '''
+    CREATE TABLE IF NOT EXISTS revenue_by_day (
+        lesson_date TEXT PRIMARY KEY,
+        lessons INTEGER NOT NULL,
+        hours REAL NOT NULL,
+        revenue REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS revenue_by_type (
+        month TEXT NOT NULL,
+        lesson_type TEXT NOT NULL,
+        lessons INTEGER NOT NULL,
+        hours REAL NOT NULL,
+        revenue REAL NOT NULL,
+        PRIMARY KEY (month, lesson_type)
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS revenue_by_instructor (
+        month TEXT NOT NULL,
+        instructor_id INTEGER NOT NULL,
+        lessons INTEGER NOT NULL,
+        hours REAL NOT NULL,
+        revenue REAL NOT NULL,
+        PRIMARY KEY (month, instructor_id)
+    ) WITHOUT ROWID;
+
+    INSERT INTO revenue_by_day
+    SELECT lesson_date, COUNT(*), TOTAL(duration), TOTAL(fee) FROM lessons
+    WHERE lesson_date IS NOT NULL AND lesson_type IS NOT NULL AND instructor_id IS NOT NULL
+    GROUP BY lesson_date;
+    INSERT INTO revenue_by_type
+    SELECT substr(lesson_date, 1, 7), lesson_type, COUNT(*), TOTAL(duration), TOTAL(fee) FROM lessons
+    WHERE lesson_date IS NOT NULL AND lesson_type IS NOT NULL AND instructor_id IS NOT NULL
+    GROUP BY 1, 2;
+    INSERT INTO revenue_by_instructor
+    SELECT substr(lesson_date, 1, 7), instructor_id, COUNT(*), TOTAL(duration), TOTAL(fee) FROM lessons
+    WHERE lesson_date IS NOT NULL AND lesson_type IS NOT NULL AND instructor_id IS NOT NULL
+    GROUP BY 1, 2;
+
+    CREATE TRIGGER IF NOT EXISTS lessons_totals_insert AFTER INSERT ON lessons
+    WHEN new.lesson_date IS NOT NULL AND new.lesson_type IS NOT NULL AND new.instructor_id IS NOT NULL
+    BEGIN
+        INSERT INTO revenue_by_day VALUES (new.lesson_date, 1, IFNULL(new.duration, 0), IFNULL(new.fee, 0))
+        ON CONFLICT (lesson_date) DO UPDATE SET
+            lessons = lessons + 1, hours = hours + excluded.hours, revenue = revenue + excluded.revenue;
+        INSERT INTO revenue_by_type
+        VALUES (substr(new.lesson_date, 1, 7), new.lesson_type, 1, IFNULL(new.duration, 0), IFNULL(new.fee, 0))
+        ON CONFLICT (month, lesson_type) DO UPDATE SET
+            lessons = lessons + 1, hours = hours + excluded.hours, revenue = revenue + excluded.revenue;
+        INSERT INTO revenue_by_instructor
+        VALUES (substr(new.lesson_date, 1, 7), new.instructor_id, 1, IFNULL(new.duration, 0), IFNULL(new.fee, 0))
+        ON CONFLICT (month, instructor_id) DO UPDATE SET
+            lessons = lessons + 1, hours = hours + excluded.hours, revenue = revenue + excluded.revenue;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS lessons_totals_delete AFTER DELETE ON lessons
+    WHEN old.lesson_date IS NOT NULL AND old.lesson_type IS NOT NULL AND old.instructor_id IS NOT NULL
+    BEGIN
+        UPDATE revenue_by_day SET
+            lessons = lessons - 1, hours = hours - IFNULL(old.duration, 0), revenue = revenue - IFNULL(old.fee, 0)
+        WHERE lesson_date = old.lesson_date;
+        UPDATE revenue_by_type SET
+            lessons = lessons - 1, hours = hours - IFNULL(old.duration, 0), revenue = revenue - IFNULL(old.fee, 0)
+        WHERE month = substr(old.lesson_date, 1, 7) AND lesson_type = old.lesson_type;
+        UPDATE revenue_by_instructor SET
+            lessons = lessons - 1, hours = hours - IFNULL(old.duration, 0), revenue = revenue - IFNULL(old.fee, 0)
+        WHERE month = substr(old.lesson_date, 1, 7) AND instructor_id = old.instructor_id;
+        DELETE FROM revenue_by_day WHERE lesson_date = old.lesson_date AND lessons = 0;
+        DELETE FROM revenue_by_type WHERE month = substr(old.lesson_date, 1, 7) AND lesson_type = old.lesson_type AND lessons = 0;
+        DELETE FROM revenue_by_instructor WHERE month = substr(old.lesson_date, 1, 7) AND instructor_id = old.instructor_id AND lessons = 0;
+    END;
+
+    -- An update takes the old row out of the totals and puts the new one in
+    CREATE TRIGGER IF NOT EXISTS lessons_totals_update_old
+    AFTER UPDATE OF lesson_date, lesson_type, instructor_id, duration, fee ON lessons
+    WHEN old.lesson_date IS NOT NULL AND old.lesson_type IS NOT NULL AND old.instructor_id IS NOT NULL
+    BEGIN
+        UPDATE revenue_by_day SET
+            lessons = lessons - 1, hours = hours - IFNULL(old.duration, 0), revenue = revenue - IFNULL(old.fee, 0)
+        WHERE lesson_date = old.lesson_date;
+        UPDATE revenue_by_type SET
+            lessons = lessons - 1, hours = hours - IFNULL(old.duration, 0), revenue = revenue - IFNULL(old.fee, 0)
+        WHERE month = substr(old.lesson_date, 1, 7) AND lesson_type = old.lesson_type;
+        UPDATE revenue_by_instructor SET
+            lessons = lessons - 1, hours = hours - IFNULL(old.duration, 0), revenue = revenue - IFNULL(old.fee, 0)
+        WHERE month = substr(old.lesson_date, 1, 7) AND instructor_id = old.instructor_id;
+        DELETE FROM revenue_by_day WHERE lesson_date = old.lesson_date AND lessons = 0;
+        DELETE FROM revenue_by_type WHERE month = substr(old.lesson_date, 1, 7) AND lesson_type = old.lesson_type AND lessons = 0;
+        DELETE FROM revenue_by_instructor WHERE month = substr(old.lesson_date, 1, 7) AND instructor_id = old.instructor_id AND lessons = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS lessons_totals_update_new
+    AFTER UPDATE OF lesson_date, lesson_type, instructor_id, duration, fee ON lessons
+    WHEN new.lesson_date IS NOT NULL AND new.lesson_type IS NOT NULL AND new.instructor_id IS NOT NULL
+    BEGIN
+        INSERT INTO revenue_by_day VALUES (new.lesson_date, 1, IFNULL(new.duration, 0), IFNULL(new.fee, 0))
+        ON CONFLICT (lesson_date) DO UPDATE SET
+            lessons = lessons + 1, hours = hours + excluded.hours, revenue = revenue + excluded.revenue;
+        INSERT INTO revenue_by_type
+        VALUES (substr(new.lesson_date, 1, 7), new.lesson_type, 1, IFNULL(new.duration, 0), IFNULL(new.fee, 0))
+        ON CONFLICT (month, lesson_type) DO UPDATE SET
+            lessons = lessons + 1, hours = hours + excluded.hours, revenue = revenue + excluded.revenue;
+        INSERT INTO revenue_by_instructor
+        VALUES (substr(new.lesson_date, 1, 7), new.instructor_id, 1, IFNULL(new.duration, 0), IFNULL(new.fee, 0))
+        ON CONFLICT (month, instructor_id) DO UPDATE SET
+            lessons = lessons + 1, hours = hours + excluded.hours, revenue = revenue + excluded.revenue;
+    END;
+    ''',
+    # 4: duplicate students and instructors are rejected by unique indexes,
+    # which also make the duplicate checks index lookups. The forms have always
+    # refused these duplicates, but imports did not; find_duplicates() names
+    # any that would stop the indexes being built.
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_students_email ON students (email);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_students_phone ON students (phone);
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_instructors_license ON instructors (license COLLATE NOCASE);
+    ''',
+    # 5: lesson types and their hourly rates, one row per rate change. The
+    # rates the app had built in apply to every lesson booked so far.
+    '''
+    CREATE TABLE IF NOT EXISTS lesson_types (
+        lesson_type TEXT NOT NULL,
+        effective_from TEXT NOT NULL,
+        hourly_rate REAL NOT NULL CHECK (hourly_rate > 0),
+        PRIMARY KEY (lesson_type, effective_from)
+    ) WITHOUT ROWID;
+    INSERT OR IGNORE INTO lesson_types VALUES
+        ('Introductory', '1970-01-01', 30),
+        ('Standard', '1970-01-01', 45),
+        ('Pass Plus', '1970-01-01', 60),
+        ('Driving Test', '1970-01-01', 75);
+    ''',
+]
+
+
+# Columns migration 4 makes unique, with the collation each index compares by
+UNIQUE_COLUMNS = [
+    ('students', 'email', 'BINARY'),
+    ('students', 'phone', 'BINARY'),
+    ('instructors', 'license', 'NOCASE'),
+]
+
+# Most problems a blocked migration lists before summarising the rest
+PROBLEMS_SHOWN = 10
+
+
+def find_duplicates(conn):
+    """Describe each value that more than one row has in a UNIQUE_COLUMNS column.
+
+    NULLs never clash in a unique index, so they are not counted.
+    """
+    found = []
+    for table, column, collation in UNIQUE_COLUMNS:
+        for value, ids in conn.execute(f'''
+            SELECT {column}, group_concat(id, ', ') FROM {table}
+            WHERE {column} IS NOT NULL
+            GROUP BY {column} COLLATE {collation} HAVING COUNT(*) > 1
+            ORDER BY MIN(id)
+        '''):
+            found.append(f"{table} {ids} share {column} {value!r}")
+    return found
+
+
+# Checks run before a migration, by number; each returns a description of
+# every problem that would make the migration fail
+MIGRATION_CHECKS = {
+    4: find_duplicates,
+}
+
+
+class MigrationError(Exception):
+    """Existing data stops a migration; the message says which rows."""
+
+
+def create_tables(db):
+    """Create the students, instructors and lessons tables if they are missing."""
+    with db.transaction() as cursor:
+        for sql in TABLES:
+            cursor.execute(sql)
+
+
+def migrate(conn):
+    """Apply every migration newer than the database's user_version.
+
+    Raises MigrationError, leaving the earlier migrations applied, when
+    existing rows would make the next one fail.
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        check = MIGRATION_CHECKS.get(number)
+        problems = check(conn) if check else []
+        if problems:
+            shown = problems[:PROBLEMS_SHOWN]
+            if len(problems) > len(shown):
+                shown.append(f"and {len(problems) - len(shown)} more")
+            raise MigrationError(
+                f"Database update {number} cannot be applied until these are fixed:\n" + '\n'.join(shown)
+            )
+        # user_version is transactional, so rolling back a failed step
+        # leaves it, and the schema, as they were
+        try:
+            conn.executescript(f"BEGIN; {script}; PRAGMA user_version = {number}; COMMIT;")
+        except BaseException:
+            # executescript stops at the failing statement with the
+            # transaction still open
+            conn.rollback()
+            raise
+
+
+def delete_rows(db, table, ids):
+    """Delete rows of table by id in one transaction.
+
+    Returns (deleted, blocked): the ids removed, and the ids that foreign keys
+    kept because other rows still refer to them. Each DELETE is a statement
+    of its own, so a blocked row only undoes itself.
+    """
+    deleted = []
+    blocked = []
+    with db.transaction(immediate=True) as cursor:
+        for row_id in ids:
+            try:
+                cursor.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+            except sqlite3.IntegrityError:
+                blocked.append(row_id)
+                continue
+            if cursor.rowcount > 0:
+                deleted.append(row_id)
+    return deleted, blocked
+
+
+class Database:
+    """The single connection the app uses for every query.
+
+    Each operation gets its own short-lived cursor, and writes go through
+    transaction() so a failed statement never leaves a transaction open on
+    the shared connection.
+    """
+    def __init__(self, path=DB_PATH):
+        self.conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE)
+        for pragma in CONNECTION_PRAGMAS:
+            self.conn.execute(pragma)
+        # A tracing cursor when the SQL trace is on, otherwise a plain one
+        self.cursor_class = cursor_factory()
+
+    def cursor(self):
+        return self.conn.cursor(self.cursor_class)
+
+    def execute(self, sql, params=()):
+        """Run one statement on a fresh cursor and return that cursor."""
+        return self.cursor().execute(sql, params)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """Commit everything run on the yielded cursor, or roll it all back.
+
+        immediate=True takes the write lock up front, for check-then-write
+        blocks that must not interleave with another writer.
+        """
+        cursor = self.cursor()
+        try:
+            if immediate:
+                cursor.execute("BEGIN IMMEDIATE")
+            yield cursor
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def close(self):
+        self.conn.close()
+
+
+class QueryExecutor:
+    """Runs database work off the Tk main loop.
+
+    Reads go to a small pool of reader threads and writes to a single writer
+    thread, each with its own Database connection. Finished jobs are queued and
+    handed back on the main loop by polling with root.after, so callbacks can
+    touch widgets safely.
+
+    Jobs submitted with a key supersede any earlier job with the same key:
+    the older one is skipped if it has not started and its result is dropped
+    if it has.
+    """
+    def __init__(self, root, path=DB_PATH, readers=2, poll_ms=20):
+        self.root = root
+        self.path = path
+        self.poll_ms = poll_ms
+        self.read_jobs = queue.Queue()
+        self.write_jobs = queue.Queue()
+        self.completed = queue.Queue()
+        self.latest = {}
+        self.ids = itertools.count(1)
+        self.closed = False
+
+        self.threads = [
+            threading.Thread(target=self.worker, args=(self.read_jobs,), daemon=True)
+            for _ in range(readers)
+        ]
+        self.threads.append(threading.Thread(target=self.worker, args=(self.write_jobs,), daemon=True))
+        for thread in self.threads:
+            thread.start()
+
+        self.root.after(self.poll_ms, self.poll)
+
+    def submit(self, work, on_done=None, on_error=None, key=None, write=False):
+        """Queue work(db) and return its job id.
+
+        on_done(result) or on_error(exception) is called on the main loop.
+        """
+        job_id = next(self.ids)
+        if key is not None:
+            self.latest[key] = job_id
+        jobs = self.write_jobs if write else self.read_jobs
+        jobs.put((job_id, key, work, on_done, on_error))
+        return job_id
+
+    def cancel(self, key):
+        """Drop whatever job is outstanding for key."""
+        self.latest.pop(key, None)
+
+    def is_stale(self, job_id, key):
+        return key is not None and self.latest.get(key) != job_id
+
+    def worker(self, jobs):
+        db = Database(self.path)
+        try:
+            while True:
+                job = jobs.get()
+                if job is None:
+                    break
+                job_id, key, work, on_done, on_error = job
+                if self.is_stale(job_id, key):
+                    continue
+                try:
+                    self.completed.put((job_id, key, on_done, work(db)))
+                except Exception as e:
+                    self.completed.put((job_id, key, on_error, e))
+        finally:
+            db.close()
+
+    def poll(self):
+        if self.closed:
+            return
+        # Reschedule first so a failing callback cannot stop the polling
+        self.root.after(self.poll_ms, self.poll)
+        while True:
+            try:
+                job_id, key, callback, value = self.completed.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_stale(job_id, key):
+                continue
+            if key is not None:
+                del self.latest[key]
+            if callback is not None:
+                callback(value)
+            elif isinstance(value, Exception):
+                raise value
+
+    def close(self):
+        """Stop the workers once the jobs already queued have run."""
+        self.closed = True
+        for _ in self.threads[:-1]:
+            self.read_jobs.put(None)
+        self.write_jobs.put(None)
+        for thread in self.threads:
+            thread.join(timeout=5)
@@ -0,0 +1,152 @@
+"""Logging setup and the opt-in SQL trace.
+
+The log level comes from DRIVING_SCHOOL_LOG_LEVEL (default WARNING). Setting
+DRIVING_SCHOOL_TRACE to a file path, or to 1 for sql_trace.log, records every
+query's SQL, bind count, row count and elapsed time to a rotating file. With
+the trace off, connections use plain sqlite3 cursors, so it costs nothing.
+
+DRIVING_SCHOOL_STARTUP_BENCHMARK=1 makes the app print how long it took from
+process start to the first interactive frame, then quit.
+"""
+import logging
+import os
+import sqlite3
+import time
+from logging.handlers import RotatingFileHandler
+
+
+LOG_LEVEL_ENV = 'DRIVING_SCHOOL_LOG_LEVEL'
+TRACE_ENV = 'DRIVING_SCHOOL_TRACE'
+STARTUP_BENCHMARK_ENV = 'DRIVING_SCHOOL_STARTUP_BENCHMARK'
+DEFAULT_TRACE_FILE = 'sql_trace.log'
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+TRACE_BACKUPS = 3
+
+trace_log = logging.getLogger('driving_school.sql')
+tracing = False
+
+
+def setup_logging():
+    """Configure logging from the environment; call once at startup."""
+    global tracing
+
+    level = os.environ.get(LOG_LEVEL_ENV, 'WARNING').upper()
+    logging.basicConfig(level=level, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    trace_path = os.environ.get(TRACE_ENV)
+    if trace_path:
+        handler = RotatingFileHandler(
+            DEFAULT_TRACE_FILE if trace_path == '1' else trace_path,
+            maxBytes=TRACE_MAX_BYTES,
+            backupCount=TRACE_BACKUPS
+        )
+        handler.setFormatter(logging.Formatter('%(asctime)s %(threadName)s %(message)s'))
+        trace_log.addHandler(handler)
+        trace_log.setLevel(logging.DEBUG)
+        trace_log.propagate = False
+        tracing = True
+
+
+def cursor_factory():
+    """The cursor class new connections should use."""
+    return TracingCursor if tracing else sqlite3.Cursor
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Cursor that writes one trace record per statement.
+
+    The record is written once the statement's rows have all been fetched or
+    iterated over, or when the cursor is reused, closed or discarded. Only the
+    time spent inside execute, fetch and iteration calls is counted.
+    """
+    statement = None
+
+    def execute(self, sql, parameters=()):
+        self.finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self.begin(sql, len(parameters), start)
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self.finish()
+        self.binds = 0
+        start = time.perf_counter()
+        super().executemany(sql, self.count_binds(seq_of_parameters))
+        self.begin(sql, self.binds, start)
+        return self
+
+    def count_binds(self, seq_of_parameters):
+        # Counts parameter sets as they stream through, without buffering them
+        for parameters in seq_of_parameters:
+            self.binds += 1
+            yield parameters
+
+    def begin(self, sql, binds, start):
+        self.statement = sql
+        self.binds = binds
+        self.rows = 0
+        self.elapsed = time.perf_counter() - start
+        if self.description is None:
+            # Not a query: report the rows changed and finish straight away
+            self.rows = max(self.rowcount, 0)
+            self.finish()
+
+    def __next__(self):
+        # Iterating the cursor reads rows without going through fetch*
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self.fetched(0, start, True)
+            raise
+        self.fetched(1, start, False)
+        return row
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self.fetched(0 if row is None else 1, start, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        start = time.perf_counter()
+        rows = super().fetchmany(size)
+        self.fetched(len(rows), start, len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self.fetched(len(rows), start, True)
+        return rows
+
+    def fetched(self, count, start, exhausted):
+        if self.statement is None:
+            return
+        self.rows += count
+        self.elapsed += time.perf_counter() - start
+        if exhausted:
+            self.finish()
+
+    def finish(self):
+        if self.statement is None:
+            return
+        trace_log.debug(
+            "%.3f ms rows=%d binds=%d %s",
+            self.elapsed * 1000, self.rows, self.binds, ' '.join(self.statement.split())
+        )
+        self.statement = None
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    def __del__(self):
+        self.finish()
+
+
+def startup_benchmark():
+    """True when DRIVING_SCHOOL_STARTUP_BENCHMARK asks the app to report its startup time and quit."""
+    return os.environ.get(STARTUP_BENCHMARK_ENV) == '1'
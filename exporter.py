@@ -0,0 +1,123 @@
+"""Streaming export of lessons and rosters to CSV or a columnar file.
+
+Rows are pulled from the cursor BATCH_SIZE at a time with fetchmany and
+written straight out, so memory use stays the same however many rows there
+are. Files are written under a temporary name and renamed once complete, so
+a failed export never leaves half a file behind.
+
+The columnar format is gzip-compressed JSON Lines: a header line naming the
+columns, then one line per batch holding that batch's values column by
+column. Like a Parquet row group, each column's values sit together, which
+compresses well. read_columnar() reads it back a row at a time.
+"""
+import csv
+import gzip
+import json
+import os
+from datetime import timedelta
+
+
+BATCH_SIZE = 2000
+
+COLUMNAR_FORMAT = 'driving-school-columnar'
+COLUMNAR_EXTENSION = '.cols.gz'
+
+LESSON_COLUMNS = (
+    'id', 'lesson_date', 'start_time', 'end_time', 'student', 'instructor',
+    'lesson_type', 'duration', 'fee', 'status'
+)
+
+# Lessons come out in lesson_date order, which a scan of idx_lessons_date
+# gives without sorting, so the query streams however large the range is
+LESSONS_QUERY = '''
+    SELECT l.id, l.lesson_date, substr(l.start_time, 12, 5), substr(l.end_time, 12, 5),
+        s.first_name || ' ' || s.last_name,
+        i.first_name || ' ' || i.last_name,
+        l.lesson_type, l.duration, l.fee, l.status
+    FROM lessons l
+    JOIN students s ON l.student_id = s.id
+    JOIN instructors i ON l.instructor_id = i.id
+    WHERE l.lesson_date >= ? AND l.lesson_date < ?
+    ORDER BY l.lesson_date
+'''
+
+ROSTER_COLUMNS = {
+    'students': ('id', 'first_name', 'last_name', 'email', 'phone'),
+    'instructors': ('id', 'first_name', 'last_name', 'license', 'email', 'phone'),
+}
+
+
+def export_lessons(db, path, first_day=None, last_day=None):
+    """Export lessons dated first_day to last_day inclusive; returns the row count.
+
+    Either end may be None to leave the range open on that side.
+    """
+    start = first_day.isoformat() if first_day else ''
+    # Every ISO date sorts before '9'
+    end = (last_day + timedelta(days=1)).isoformat() if last_day else '9'
+    return export_query(db, path, LESSON_COLUMNS, LESSONS_QUERY, (start, end))
+
+
+def export_roster(db, table, path):
+    """Export every student or instructor; returns the row count."""
+    columns = ROSTER_COLUMNS[table]
+    sql = f"SELECT {', '.join(columns)} FROM {table} ORDER BY id"
+    return export_query(db, path, columns, sql)
+
+
+def export_query(db, path, columns, sql, params=()):
+    """Stream the rows of a query to path, as columnar if it ends in COLUMNAR_EXTENSION."""
+    writer = write_columnar if path.endswith(COLUMNAR_EXTENSION) else write_csv
+    cursor = db.execute(sql, params)
+    partial = path + '.part'
+    try:
+        count = writer(partial, columns, batches(cursor))
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        cursor.close()
+    return count
+
+
+def batches(cursor):
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            return
+        yield rows
+
+
+def write_csv(path, columns, row_batches):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        for rows in row_batches:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_columnar(path, columns, row_batches):
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as output:
+        output.write(json.dumps({'format': COLUMNAR_FORMAT, 'version': 1, 'columns': list(columns)}) + '\n')
+        for rows in row_batches:
+            data = [list(values) for values in zip(*rows)]
+            output.write(json.dumps({'rows': len(rows), 'data': data}, separators=(',', ':')) + '\n')
+            count += len(rows)
+    return count
+
+
+def read_columnar(path):
+    """Yield the column names, then each row as a tuple."""
+    with gzip.open(path, 'rt', encoding='utf-8') as source:
+        header = json.loads(source.readline())
+        if header.get('format') != COLUMNAR_FORMAT:
+            raise ValueError(f"{os.path.basename(path)} is not a columnar export")
+        yield tuple(header['columns'])
+        for line in source:
+            yield from zip(*json.loads(line)['data'])
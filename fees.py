@@ -0,0 +1,108 @@
+"""Lesson types, their hourly rates, and repricing of booked lessons.
+
+Rates live in the lesson_types table, one row per type per date a rate took
+effect (see migration 5 in database.py). The app loads them once into a
+RateTable and looks fees up in memory; it reloads only after a rate is
+changed. A lesson's fee is worked out when it is booked and stored with it,
+so a new rate never alters lessons already taught. Booked lessons still to
+come can be repriced in bulk with one UPDATE ... FROM.
+"""
+from bisect import bisect_right
+from datetime import date
+from types import MappingProxyType
+
+
+RATES_QUERY = "SELECT lesson_type, effective_from, hourly_rate FROM lesson_types ORDER BY lesson_type, effective_from"
+
+# Sets each booked lesson in a date range to duration times the rate in
+# effect on its date. Only rows whose fee changes are written, so the
+# revenue triggers see just those.
+REPRICE_QUERY = '''
+    UPDATE lessons SET fee = r.hourly_rate * lessons.duration
+    FROM lesson_types r
+    WHERE lessons.lesson_date >= :first_day AND lessons.lesson_date < :end
+        AND lessons.status = 'Booked'
+        AND (:lesson_type IS NULL OR lessons.lesson_type = :lesson_type)
+        AND r.lesson_type = lessons.lesson_type
+        AND r.effective_from = (
+            SELECT MAX(effective_from) FROM lesson_types
+            WHERE lesson_type = lessons.lesson_type AND effective_from <= lessons.lesson_date
+        )
+        AND lessons.fee IS NOT r.hourly_rate * lessons.duration
+'''
+
+
+class RateTable:
+    """Hourly rates by lesson type and date.
+
+    Never changed once built: a reload builds a new table and swaps it in,
+    so lookups need no locking.
+    """
+    def __init__(self, rows=()):
+        schedules = {}
+        for lesson_type, effective_from, hourly_rate in rows:
+            dates, rates = schedules.setdefault(lesson_type, ([], []))
+            dates.append(effective_from)
+            rates.append(hourly_rate)
+        self.schedules = MappingProxyType({
+            lesson_type: (tuple(dates), tuple(rates))
+            for lesson_type, (dates, rates) in schedules.items()
+        })
+
+        # Types for the lesson form, cheapest first at today's rates
+        today = date.today()
+        self.types = tuple(sorted(self.schedules, key=lambda t: (self.rate(t, today) or 0, t)))
+
+    @classmethod
+    def load(cls, db):
+        return cls(db.execute(RATES_QUERY))
+
+    def rate(self, lesson_type, day):
+        """The hourly rate for lesson_type on day, or None if it has none."""
+        if lesson_type not in self.schedules:
+            return None
+        dates, rates = self.schedules[lesson_type]
+        position = bisect_right(dates, str(day)[:10])
+        return rates[position - 1] if position else None
+
+    def fee(self, lesson_type, day, hours):
+        rate = self.rate(lesson_type, day)
+        return None if rate is None else rate * hours
+
+
+def set_rate(db, lesson_type, hourly_rate, effective_from, reprice=True):
+    """Charge hourly_rate for lesson_type from effective_from onwards.
+
+    With reprice, booked lessons from then until the type's next rate change
+    are repriced, but never any before today. Returns how many were repriced.
+    """
+    first_day = effective_from.isoformat()
+    with db.transaction(immediate=True) as cursor:
+        cursor.execute('''
+            INSERT INTO lesson_types (lesson_type, effective_from, hourly_rate) VALUES (?, ?, ?)
+            ON CONFLICT (lesson_type, effective_from) DO UPDATE SET hourly_rate = excluded.hourly_rate
+        ''', (lesson_type, first_day, hourly_rate))
+        if not reprice:
+            return 0
+
+        cursor.execute(
+            "SELECT MIN(effective_from) FROM lesson_types WHERE lesson_type = ? AND effective_from > ?",
+            (lesson_type, first_day)
+        )
+        next_change = cursor.fetchone()[0]
+        return reprice_lessons(cursor, max(first_day, date.today().isoformat()), next_change, lesson_type)
+
+
+def reprice_lessons(cursor, first_day, end=None, lesson_type=None):
+    """Reprice booked lessons dated from first_day up to but not including end.
+
+    Covers every type unless lesson_type is given; end None means no limit.
+    Takes ISO date strings and returns the number of lessons repriced.
+    """
+    cursor.execute(REPRICE_QUERY, {
+        'first_day': first_day,
+        # Every ISO date sorts before '9'
+        'end': end or '9',
+        'lesson_type': lesson_type,
+    })
+    return cursor.rowcount
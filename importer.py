@@ -0,0 +1,251 @@
+"""Bulk import of students, instructors and lessons from CSV files.
+
+Files are read a chunk at a time, so memory use does not depend on the file
+size. Each row gets the same checks as the matching form in the app, but
+duplicates and clashes are looked up in sets loaded once before the import
+instead of with a query per row. Each chunk of good rows goes in with one
+executemany in its own transaction, and is added to the search indexes in
+one pass rather than by the per-row triggers. Bad rows are copied to a
+reject file next to the input, with an error column saying what was wrong.
+"""
+import csv
+import itertools
+import os
+import re
+import time
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from fees import RateTable
+from scheduling import MAX_LESSON_HOURS, lesson_interval
+from search import deferred_indexing
+
+
+# Shared with the add student and add instructor forms
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+LICENSE_PATTERN = r'^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d]+$'
+
+# Rows validated and inserted per transaction
+CHUNK_SIZE = 5000
+
+
+class ImportResult(NamedTuple):
+    imported: int
+    rejected: int
+    seconds: float
+    reject_path: str  # None when no row was rejected
+
+    @property
+    def rows_per_second(self):
+        return (self.imported + self.rejected) / self.seconds if self.seconds else 0.0
+
+
+class RejectedRow(ValueError):
+    """A row that fails validation; the message goes in the reject file."""
+
+
+class StudentImport:
+    columns = ('first_name', 'last_name', 'email', 'phone')
+    insert_sql = "INSERT INTO students (first_name, last_name, email, phone) VALUES (?, ?, ?, ?)"
+
+    def load(self, db):
+        self.emails = set()
+        self.phones = set()
+        for email, phone in db.execute("SELECT email, phone FROM students"):
+            self.emails.add(email)
+            self.phones.add(phone)
+
+    def row_values(self, row):
+        first_name, last_name, email, phone = (row[column] for column in self.columns)
+        if not all([first_name, last_name, email, phone]):
+            raise RejectedRow("Please fill in all fields")
+        if not phone.isdigit():
+            raise RejectedRow("Phone number must contain only digits")
+        if len(phone) != 11:
+            raise RejectedRow("Phone number must be exactly 11 digits")
+        if not re.match(EMAIL_PATTERN, email):
+            raise RejectedRow("Please enter a valid email address")
+        if email in self.emails:
+            raise RejectedRow("A student with this email already exists")
+        if phone in self.phones:
+            raise RejectedRow("A student with this phone number already exists")
+
+        # Later rows in the same file count as duplicates of this one
+        self.emails.add(email)
+        self.phones.add(phone)
+        return first_name, last_name, email, phone
+
+
+class InstructorImport:
+    columns = ('first_name', 'last_name', 'license')
+    optional = ('email', 'phone')
+    insert_sql = "INSERT INTO instructors (first_name, last_name, license, email, phone) VALUES (?, ?, ?, ?, ?)"
+
+    def load(self, db):
+        # Licence numbers are compared case-insensitively, as in add_instructor
+        self.licenses = {license.upper() for license, in db.execute("SELECT license FROM instructors") if license}
+
+    def row_values(self, row):
+        first_name, last_name, license = (row[column] for column in self.columns)
+        if not first_name or not last_name:
+            raise RejectedRow("First Name and Last Name cannot be empty.")
+        if not license:
+            raise RejectedRow("License Number cannot be empty.")
+        if not re.match(LICENSE_PATTERN, license):
+            raise RejectedRow("License Number must contain both letters and numbers.")
+        if license.upper() in self.licenses:
+            raise RejectedRow("This License Number is already registered.")
+
+        self.licenses.add(license.upper())
+        return first_name, last_name, license, row.get('email') or None, row.get('phone') or None
+
+
+class LessonImport:
+    columns = ('student_id', 'instructor_id', 'lesson_type', 'lesson_date', 'start_time', 'duration')
+    # The fee is worked out from the rate table, as in the lesson form; a
+    # fee in the file must agree with it
+    optional = ('fee', 'status')
+    insert_sql = '''
+        INSERT INTO lessons
+            (student_id, instructor_id, lesson_type, lesson_date, start_time, end_time, duration, status, fee)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    def load(self, db):
+        self.students = {student_id for student_id, in db.execute("SELECT id FROM students")}
+        self.instructors = {instructor_id for instructor_id, in db.execute("SELECT id FROM instructors")}
+        self.rates = RateTable.load(db)
+
+        # Booked lessons per (person, day); a lesson can run past midnight
+        # but never by more than MAX_LESSON_HOURS, so a clash check only has
+        # to look at the lesson's own day and the day before
+        self.busy = {}
+        for student_id, instructor_id, start, end in db.execute(
+            "SELECT student_id, instructor_id, start_time, end_time FROM lessons WHERE start_time IS NOT NULL"
+        ):
+            self.add_busy(student_id, instructor_id, start, end)
+
+    def add_busy(self, student_id, instructor_id, start, end):
+        for person in (('instructor', instructor_id), ('student', student_id)):
+            self.busy.setdefault(person + (start[:10],), []).append((start, end))
+
+    def find_clash(self, student_id, instructor_id, start, end):
+        day = date.fromisoformat(start[:10])
+        days = (day.isoformat(), (day - timedelta(days=1)).isoformat())
+        for person in (('instructor', instructor_id), ('student', student_id)):
+            for busy_day in days:
+                for busy_start, busy_end in self.busy.get(person + (busy_day,), ()):
+                    if busy_start < end and busy_end > start:
+                        return person[0]
+        return None
+
+    def row_values(self, row):
+        if not all(row[column] for column in self.columns):
+            raise RejectedRow("Please fill in all fields")
+        try:
+            student_id = int(row['student_id'])
+            instructor_id = int(row['instructor_id'])
+        except ValueError:
+            raise RejectedRow("Student and instructor ids must be whole numbers")
+        if student_id not in self.students:
+            raise RejectedRow(f"Student {student_id} not found.")
+        if instructor_id not in self.instructors:
+            raise RejectedRow(f"Instructor {instructor_id} not found.")
+
+        try:
+            duration = int(row['duration'])
+        except ValueError:
+            raise RejectedRow("Please enter a valid duration")
+        if not 0 < duration <= MAX_LESSON_HOURS:
+            raise RejectedRow(f"Duration must be between 1 and {MAX_LESSON_HOURS} hours")
+
+        try:
+            start, end = lesson_interval(date.fromisoformat(row['lesson_date']), row['start_time'], duration)
+        except ValueError:
+            raise RejectedRow("Lesson date must be YYYY-MM-DD and start time HH:MM")
+
+        fee = self.rates.fee(row['lesson_type'], start[:10], duration)
+        if fee is None:
+            raise RejectedRow(f"Lesson type '{row['lesson_type']}' has no rate on {start[:10]}")
+        if row.get('fee'):
+            try:
+                supplied = float(row['fee'])
+            except ValueError:
+                raise RejectedRow("Fee must be a number")
+            if abs(supplied - fee) > 0.005:
+                raise RejectedRow(f"Fee {supplied:g} does not match the rate for that date, which gives {fee:g}")
+
+        clash = self.find_clash(student_id, instructor_id, start, end)
+        if clash:
+            raise RejectedRow(f"The {clash} already has a lesson between {start} and {end[11:]}.")
+
+        self.add_busy(student_id, instructor_id, start, end)
+        status = row.get('status') or 'Booked'
+        return student_id, instructor_id, row['lesson_type'], start[:10], start, end, duration, status, fee
+
+
+IMPORTERS = {
+    'students': StudentImport,
+    'instructors': InstructorImport,
+    'lessons': LessonImport,
+}
+
+
+def import_csv(db, table, path, chunk_size=CHUNK_SIZE):
+    """Import the rows of a CSV file into table and return an ImportResult.
+
+    The header row names the columns, in any order and case. Raises
+    ValueError if a required column is missing. If a chunk fails to insert,
+    the chunks before it stay imported.
+    """
+    importer = IMPORTERS[table]()
+    started = time.perf_counter()
+    imported = rejected = 0
+    reject_path = None
+    rejects = reject_file = None
+
+    with open(path, newline='', encoding='utf-8-sig') as source:
+        reader = csv.DictReader(source)
+        fields = [field.strip().lower() for field in reader.fieldnames or []]
+        missing = [column for column in importer.columns if column not in fields]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)} is missing columns: {', '.join(missing)}")
+        reader.fieldnames = fields
+        columns = importer.columns + tuple(c for c in getattr(importer, 'optional', ()) if c in fields)
+
+        importer.load(db)
+        try:
+            while True:
+                chunk = list(itertools.islice(reader, chunk_size))
+                if not chunk:
+                    break
+
+                rows = []
+                for record in chunk:
+                    row = {column: (record.get(column) or '').strip() for column in columns}
+                    try:
+                        rows.append(importer.row_values(row))
+                    except RejectedRow as e:
+                        if rejects is None:
+                            reject_path = rejects_path(path)
+                            reject_file = open(reject_path, 'w', newline='', encoding='utf-8')
+                            rejects = csv.DictWriter(reject_file, fieldnames=fields + ['error'], extrasaction='ignore')
+                            rejects.writeheader()
+                        rejects.writerow({**record, 'error': str(e)})
+                        rejected += 1
+
+                # Search indexes are brought up to date once per chunk
+                with db.transaction(immediate=True) as cursor, deferred_indexing(cursor, table):
+                    cursor.executemany(importer.insert_sql, rows)
+                imported += len(rows)
+        finally:
+            if reject_file is not None:
+                reject_file.close()
+
+    return ImportResult(imported, rejected, time.perf_counter() - started, reject_path)
+
+
+def rejects_path(path):
+    """students.csv -> students.rejects.csv"""
+    base, extension = os.path.splitext(path)
+    return f"{base}.rejects{extension or '.csv'}"
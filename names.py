@@ -0,0 +1,133 @@
+"""Sorted index of student and instructor names for the booking dropdowns.
+
+The index is built once from the database and then kept current as people
+are added or deleted, so a dropdown never re-reads its table. Each person
+appears under "First Last" and under "Last First"; both lists are kept
+sorted, so the names starting with what has been typed are found with a
+binary search and only the first few are handed to the combobox.
+"""
+from bisect import bisect_left, insort
+from collections.abc import Mapping
+
+
+# Most names a type-ahead dropdown lists at once
+MATCH_LIMIT = 50
+
+NAMES_QUERY = "SELECT id, first_name, last_name FROM {table}"
+
+
+class NameIndex(Mapping):
+    """Maps each dropdown label to a person's id.
+
+    Labels are "First Last"; people who share a name get their id appended
+    so every label picks out exactly one record.
+    """
+    def __init__(self, rows=()):
+        self.names = {}      # id -> (first_name, last_name)
+        self.shared = {}     # "First Last" -> ids of everyone with that name
+        self.ids = {}        # label -> id
+        self.by_first = []   # sorted (key, label), key "first last" folded
+        self.by_last = []    # sorted (key, label), key "last first" folded
+
+        for person_id, first_name, last_name in rows:
+            self.names[person_id] = (first_name, last_name)
+            self.shared.setdefault(f"{first_name} {last_name}", []).append(person_id)
+        for name, person_ids in self.shared.items():
+            person_ids.sort()
+            for person_id in person_ids:
+                self.ids[self.make_label(person_id, name)] = person_id
+        self.by_first = sorted(self.entries(self.by_first_key))
+        self.by_last = sorted(self.entries(self.by_last_key))
+
+    @classmethod
+    def load(cls, db, table):
+        return cls(db.execute(NAMES_QUERY.format(table=table)))
+
+    def __getitem__(self, label):
+        return self.ids[label]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def label(self, person_id):
+        first_name, last_name = self.names[person_id]
+        return self.make_label(person_id, f"{first_name} {last_name}")
+
+    def make_label(self, person_id, name):
+        return f"{name} (#{person_id})" if len(self.shared[name]) > 1 else name
+
+    def by_first_key(self, label):
+        return label.casefold()
+
+    def by_last_key(self, label):
+        first_name, last_name = self.names[self.ids[label]]
+        return f"{last_name} {first_name}".casefold()
+
+    def entries(self, key):
+        return ((key(label), label) for label in self.ids)
+
+    def add(self, person_id, first_name, last_name):
+        """Add a newly inserted person."""
+        name = f"{first_name} {last_name}"
+        others = self.shared.get(name, [])
+        self.unlist(others)
+        self.names[person_id] = (first_name, last_name)
+        self.shared[name] = sorted(others + [person_id])
+        self.relist(self.shared[name])
+
+    def remove(self, *person_ids):
+        """Drop deleted people; unknown ids are ignored."""
+        for person_id in person_ids:
+            if person_id not in self.names:
+                continue
+            first_name, last_name = self.names[person_id]
+            name = f"{first_name} {last_name}"
+            others = self.shared[name]
+            self.unlist(others)
+            others.remove(person_id)
+            del self.names[person_id]
+            if others:
+                # Someone left alone with a name goes back to the plain label
+                self.relist(others)
+            else:
+                del self.shared[name]
+
+    def unlist(self, person_ids):
+        # Labels depend on how many share the name, so they are taken out
+        # and put back whenever that changes
+        for person_id in person_ids:
+            label = self.label(person_id)
+            for entries, key in ((self.by_first, self.by_first_key), (self.by_last, self.by_last_key)):
+                del entries[bisect_left(entries, (key(label), label))]
+            del self.ids[label]
+
+    def relist(self, person_ids):
+        for person_id in person_ids:
+            label = self.label(person_id)
+            self.ids[label] = person_id
+            insort(self.by_first, (self.by_first_key(label), label))
+            insort(self.by_last, (self.by_last_key(label), label))
+
+    def matches(self, text, limit=MATCH_LIMIT):
+        """Up to limit labels whose first or last name starts with text.
+
+        Matches on the first name come first, each group in alphabetical
+        order. Blank text matches everyone.
+        """
+        prefix = ' '.join(text.split()).casefold()
+        found = []
+        for entries in (self.by_first, self.by_last):
+            position = bisect_left(entries, (prefix,))
+            while position < len(entries) and len(found) < limit:
+                key, label = entries[position]
+                if not key.startswith(prefix):
+                    break
+                if label not in found:
+                    found.append(label)
+                position += 1
+            if not prefix:
+                break
+        return found
@@ -0,0 +1,108 @@
+"""Revenue and utilisation figures for the Reports tab.
+
+Everything here reads the revenue_by_* summary tables, which triggers on
+lessons keep up to date (see migration 3 in database.py). Daily totals roll
+up into weeks and months, and the per lesson type and per instructor totals
+are kept by month. A report therefore reads one row per period, or per
+type or instructor per month, whatever the size of the lessons table.
+"""
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from scheduling import WORKING_DAYS, WORKING_HOURS
+
+
+# How each grouping labels a day; weeks are named by their Monday
+PERIODS = {
+    'Day': "lesson_date",
+    'Week': "date(lesson_date, '-' || ((strftime('%w', lesson_date) + 6) % 7) || ' days')",
+    'Month': "substr(lesson_date, 1, 7)",
+}
+
+
+class Totals(NamedTuple):
+    label: str
+    lessons: int
+    hours: float
+    revenue: float
+
+
+class Utilisation(NamedTuple):
+    instructor: str
+    lessons: int
+    hours: float
+    revenue: float
+    utilisation: float  # booked hours as a fraction of working hours
+
+
+def report_years(db):
+    """The years that have lessons, newest first."""
+    rows = db.execute(
+        "SELECT DISTINCT substr(lesson_date, 1, 4) FROM revenue_by_day ORDER BY 1 DESC"
+    ).fetchall()
+    return [year for year, in rows]
+
+
+def revenue_by_period(db, first_day, last_day, period):
+    """Totals for each Day, Week or Month between first_day and last_day inclusive."""
+    label = PERIODS[period]
+    rows = db.execute(f'''
+        SELECT {label}, SUM(lessons), SUM(hours), SUM(revenue)
+        FROM revenue_by_day
+        WHERE lesson_date >= ? AND lesson_date <= ?
+        GROUP BY 1
+        ORDER BY 1
+    ''', (first_day.isoformat(), last_day.isoformat())).fetchall()
+    return [Totals._make(row) for row in rows]
+
+
+def revenue_by_type(db, first_day, last_day):
+    """Totals per lesson type for the whole months from first_day to last_day."""
+    rows = db.execute('''
+        SELECT lesson_type, SUM(lessons), SUM(hours), SUM(revenue)
+        FROM revenue_by_type
+        WHERE month >= ? AND month <= ?
+        GROUP BY lesson_type
+        ORDER BY SUM(revenue) DESC
+    ''', month_bounds(first_day, last_day)).fetchall()
+    return [Totals._make(row) for row in rows]
+
+
+def instructor_utilisation(db, first_day, last_day):
+    """Totals and utilisation per instructor for the whole months from first_day to last_day."""
+    capacity = working_hours(first_day, last_day)
+    rows = db.execute('''
+        SELECT i.first_name || ' ' || i.last_name, SUM(r.lessons), SUM(r.hours), SUM(r.revenue)
+        FROM revenue_by_instructor r
+        JOIN instructors i ON i.id = r.instructor_id
+        WHERE r.month >= ? AND r.month <= ?
+        GROUP BY r.instructor_id
+        ORDER BY SUM(r.hours) DESC
+    ''', month_bounds(first_day, last_day)).fetchall()
+    return [
+        Utilisation(name, lessons, hours, revenue, hours / capacity if capacity else 0.0)
+        for name, lessons, hours, revenue in rows
+    ]
+
+
+def month_bounds(first_day, last_day):
+    return first_day.isoformat()[:7], last_day.isoformat()[:7]
+
+
+def working_hours(first_day, last_day):
+    """Hours an instructor can teach between first_day and last_day inclusive."""
+    opens, closes = ((int(time[:2]) * 60 + int(time[3:])) for time in WORKING_HOURS)
+    days = sum(
+        1 for offset in range((last_day - first_day).days + 1)
+        if (first_day + timedelta(days=offset)).weekday() in WORKING_DAYS
+    )
+    return days * (closes - opens) / 60
+
+
+def year_range(year, month=None):
+    """The first and last day of a year, or of one month in it."""
+    if month is None:
+        return date(year, 1, 1), date(year, 12, 31)
+    first_day = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return first_day, next_month - timedelta(days=1)
@@ -0,0 +1,273 @@
+"""Lesson times and double-booking checks."""
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+
+# book_lesson refuses anything longer, which bounds how far back an
+# overlapping lesson can start
+MAX_LESSON_HOURS = 10
+
+# start_time/end_time are stored in this form so they sort as text
+TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+# Start times offered in the lesson form
+START_TIMES = [f"{hour:02d}:{minute:02d}" for hour in range(7, 21) for minute in (0, 30)]
+
+# Lessons already booked for the instructor or the student that overlap
+# [start, end). The earliest bound turns each half into a range seek on the
+# (instructor_id, start_time) and (student_id, start_time) indexes.
+CONFLICT_QUERY = '''
+    SELECT 'instructor' FROM lessons
+    WHERE instructor_id = :instructor_id
+        AND start_time > :earliest AND start_time < :end AND end_time > :start
+    UNION ALL
+    SELECT 'student' FROM lessons
+    WHERE student_id = :student_id
+        AND start_time > :earliest AND start_time < :end AND end_time > :start
+    LIMIT 1
+'''
+
+
+LESSON_INSERT = '''
+    INSERT INTO lessons
+        (student_id, instructor_id, lesson_type, lesson_date, start_time, end_time, duration, status, fee)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Most lessons one recurring series can book
+MAX_SERIES_LESSONS = 200
+
+# Every lesson of the instructor or the student that could overlap a series
+# running from :earliest to :end, in one range seek per index
+SERIES_BUSY_QUERY = '''
+    SELECT 'instructor', start_time, end_time FROM lessons
+    WHERE instructor_id = :instructor_id AND start_time > :earliest AND start_time < :end
+    UNION ALL
+    SELECT 'student', start_time, end_time FROM lessons
+    WHERE student_id = :student_id AND start_time > :earliest AND start_time < :end
+    ORDER BY 2
+'''
+
+
+def lesson_interval(day, start_time, hours):
+    """Return the (start, end) strings for a lesson starting at HH:MM on day."""
+    start = datetime.combine(day, datetime.strptime(start_time, '%H:%M').time())
+    end = start + timedelta(hours=hours)
+    return start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT)
+
+
+def find_conflict(cursor, student_id, instructor_id, start, end):
+    """Return 'instructor' or 'student' for whoever is already busy, else None."""
+    earliest = datetime.strptime(start, TIME_FORMAT) - timedelta(hours=MAX_LESSON_HOURS)
+    cursor.execute(CONFLICT_QUERY, {
+        'student_id': student_id,
+        'instructor_id': instructor_id,
+        'earliest': earliest.strftime(TIME_FORMAT),
+        'start': start,
+        'end': end,
+    })
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def book_lesson(db, student_id, instructor_id, lesson_type, start, end, duration, status, fee):
+    """Insert a lesson unless it overlaps one already booked.
+
+    Returns None once booked, or whose booking it clashes with. The check and
+    the insert share one BEGIN IMMEDIATE transaction, so two processes booking
+    at once cannot both pass the check.
+    """
+    with db.transaction(immediate=True) as cursor:
+        clash = find_conflict(cursor, student_id, instructor_id, start, end)
+        if clash:
+            return clash
+        cursor.execute(LESSON_INSERT, (student_id, instructor_id, lesson_type, start[:10], start, end, duration, status, fee))
+    return None
+
+
+def series_days(first_day, every_days, count=None, until=None):
+    """The dates of a series starting on first_day and repeating every_days apart.
+
+    The series stops after count lessons or on the last date not after until,
+    whichever comes first, and never runs past MAX_SERIES_LESSONS.
+    """
+    limit = min(count or MAX_SERIES_LESSONS, MAX_SERIES_LESSONS)
+    days = []
+    day = first_day
+    while len(days) < limit and (until is None or day <= until):
+        days.append(day)
+        day += timedelta(days=every_days)
+    return days
+
+
+def find_series_conflicts(cursor, student_id, instructor_id, lessons):
+    """Return (start, end, 'instructor' or 'student') for each lesson that clashes.
+
+    lessons holds (start, end, ...) tuples in date order. Everything booked
+    for either person over the whole series is read with one query, and each
+    lesson is then checked against it by binary search.
+    """
+    if not lessons:
+        return []
+    earliest = datetime.strptime(lessons[0][0], TIME_FORMAT) - timedelta(hours=MAX_LESSON_HOURS)
+    cursor.execute(SERIES_BUSY_QUERY, {
+        'student_id': student_id,
+        'instructor_id': instructor_id,
+        'earliest': earliest.strftime(TIME_FORMAT),
+        'end': max(lesson[1] for lesson in lessons),
+    })
+    busy = {'instructor': ([], []), 'student': ([], [])}
+    for who, start, end in cursor.fetchall():
+        starts, ends = busy[who]
+        starts.append(start)
+        ends.append(end)
+
+    clashes = []
+    for start, end, *_ in lessons:
+        # Only lessons starting within MAX_LESSON_HOURS before this one can reach it
+        reach = (datetime.strptime(start, TIME_FORMAT) - timedelta(hours=MAX_LESSON_HOURS)).strftime(TIME_FORMAT)
+        for who, (starts, ends) in busy.items():
+            first, last = bisect_right(starts, reach), bisect_left(starts, end)
+            if any(busy_end > start for busy_end in ends[first:last]):
+                clashes.append((start, end, who))
+                break
+    return clashes
+
+
+def book_series(db, student_id, instructor_id, lesson_type, lessons, status):
+    """Book a series of lessons, or none of them if any clashes.
+
+    lessons holds (start, end, duration, fee) for each lesson, in date order.
+    Returns the clashes found by find_series_conflicts(); the series is
+    booked only when there are none. The check and a single executemany
+    share one BEGIN IMMEDIATE transaction.
+    """
+    with db.transaction(immediate=True) as cursor:
+        clashes = find_series_conflicts(cursor, student_id, instructor_id, lessons)
+        if clashes:
+            return clashes
+        cursor.executemany(LESSON_INSERT, [
+            (student_id, instructor_id, lesson_type, start[:10], start, end, duration, status, fee)
+            for start, end, duration, fee in lessons
+        ])
+    return []
+
+
+# Hours and days (Monday = 0) when lessons can be suggested, and the spacing
+# of suggested start times
+WORKING_HOURS = ('08:00', '18:00')
+WORKING_DAYS = {0, 1, 2, 3, 4, 5}
+SLOT_STEP_MINUTES = 30
+
+# Days of lessons read at a time; reading stops once every instructor has
+# enough free slots, so a diary with room early on costs one small query
+SEARCH_CHUNK_DAYS = 7
+
+# Everything booked in a date range, in one range scan of idx_lessons_date,
+# with times as whole minutes after the search's first midnight
+BUSY_QUERY = '''
+    SELECT instructor_id, student_id,
+        (strftime('%s', start_time) - strftime('%s', :origin)) / 60,
+        (strftime('%s', end_time) - strftime('%s', :origin)) / 60
+    FROM lessons
+    WHERE lesson_date >= :first_day AND lesson_date < :last_day
+'''
+
+
+def suggest_slots(db, instructor_ids, hours, first_day, days=90, count=5, student_id=None, now=None):
+    """Return {instructor_id: [(start, end), ...]} with each instructor's first free slots.
+
+    A slot is free when it falls inside working hours on a working day, does
+    not overlap the instructor's lessons and, if student_id is given, does not
+    overlap the student's lessons either. Slots start on SLOT_STEP_MINUTES
+    boundaries, never before now, and do not overlap each other. Raises
+    ValueError unless hours is more than zero.
+    """
+    if hours <= 0:
+        raise ValueError("Lessons must last more than zero hours")
+
+    origin = datetime.combine(first_day, datetime.min.time())
+    now = now or datetime.now()
+    open_minute, close_minute = (minutes_since(origin, f"{first_day.isoformat()} {time}") for time in WORKING_HOURS)
+    earliest = max(0, minutes_since(origin, now.strftime(TIME_FORMAT)))
+    length = int(hours * 60)
+
+    # Busy intervals as minutes from the first midnight; those still running
+    # at the end of a chunk are carried into the next one
+    instructor_busy = {instructor_id: [] for instructor_id in instructor_ids}
+    student_busy = []
+    slots = {instructor_id: [] for instructor_id in instructor_ids}
+    searching = set(instructor_ids)
+
+    for chunk_start in range(0, days, SEARCH_CHUNK_DAYS):
+        if not searching:
+            break
+        chunk_end = min(chunk_start + SEARCH_CHUNK_DAYS, days)
+        rows = db.execute(BUSY_QUERY, {
+            'origin': first_day.isoformat(),
+            'first_day': (first_day + timedelta(days=chunk_start)).isoformat(),
+            'last_day': (first_day + timedelta(days=chunk_end)).isoformat(),
+        }).fetchall()
+        for instructor_id, lesson_student_id, start, end in rows:
+            interval = (start, end)
+            if instructor_id in searching:
+                instructor_busy[instructor_id].append(interval)
+            if student_id is not None and lesson_student_id == student_id:
+                student_busy.append(interval)
+
+        working_days = [
+            day for day in range(chunk_start, chunk_end)
+            if (first_day + timedelta(days=day)).weekday() in WORKING_DAYS
+        ]
+        for instructor_id in list(searching):
+            busy = merge_intervals(instructor_busy[instructor_id] + student_busy)
+            found = slots[instructor_id]
+            position = 0
+            for day in working_days:
+                start = max(day * 1440 + open_minute, align(earliest))
+                close = day * 1440 + close_minute
+                while start + length <= close and len(found) < count:
+                    # Skip busy time that ends before this candidate slot
+                    while position < len(busy) and busy[position][1] <= start:
+                        position += 1
+                    if position < len(busy) and busy[position][0] < start + length:
+                        start = align(busy[position][1])
+                        continue
+                    found.append((start, start + length))
+                    start = align(start + length)
+                if len(found) >= count:
+                    searching.discard(instructor_id)
+                    break
+            instructor_busy[instructor_id] = [interval for interval in busy if interval[1] > chunk_end * 1440]
+        student_busy = [interval for interval in student_busy if interval[1] > chunk_end * 1440]
+
+    return {
+        instructor_id: [
+            (
+                (origin + timedelta(minutes=start)).strftime(TIME_FORMAT),
+                (origin + timedelta(minutes=end)).strftime(TIME_FORMAT)
+            )
+            for start, end in found
+        ]
+        for instructor_id, found in slots.items()
+    }
+
+
+def merge_intervals(intervals):
+    """Sort intervals and join the ones that overlap or touch."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def minutes_since(origin, timestamp):
+    return int((datetime.fromisoformat(timestamp) - origin).total_seconds() // 60)
+
+
+def align(minute):
+    """Round minute up to the next slot boundary."""
+    return -(-minute // SLOT_STEP_MINUTES) * SLOT_STEP_MINUTES
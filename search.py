@@ -0,0 +1,201 @@
+"""Full-text search over students and instructors.
+
+Each searchable table gets two external-content FTS5 indexes kept in sync by
+triggers: a word index with prefix support for short terms, and a trigram
+index that matches any substring of three or more characters, the same way
+the old LIKE '%term%' queries did. Results are ranked by BM25. Builds of
+SQLite without FTS5 (or without the trigram tokenizer) fall back to the
+closest thing they support.
+"""
+import sqlite3
+from contextlib import contextmanager
+
+
+# Searchable columns per table, and the columns a search returns. Results
+# carry every searchable column so refine() can filter them locally; the
+# trees ignore values beyond their own columns.
+SEARCH_COLUMNS = {
+    'students': ('first_name', 'last_name', 'email', 'phone'),
+    'instructors': ('first_name', 'last_name', 'email', 'phone', 'license'),
+}
+RESULT_COLUMNS = {
+    'students': ('id', 'first_name', 'last_name', 'email', 'phone'),
+    'instructors': ('id', 'first_name', 'last_name', 'license', 'email', 'phone'),
+}
+
+# Index name suffix, tokenizer it needs, and FTS5 options for each kind of index
+INDEX_KINDS = [
+    ('fts', 'unicode61', "tokenize='unicode61 remove_diacritics 2', prefix='2 3'"),
+    ('trigram', 'trigram', "tokenize='trigram'"),
+]
+
+# Trigram indexes cannot match anything shorter than this
+TRIGRAM_MIN_LENGTH = 3
+
+# Rows the search boxes show at once; the tree offers to show more
+SEARCH_LIMIT = 200
+
+
+def create_search_index(conn):
+    """Create any missing search indexes and triggers.
+
+    Returns False when this SQLite build has no FTS5, in which case searches
+    use LIKE queries instead.
+    """
+    kinds = [kind for kind in INDEX_KINDS if supports_tokenizer(conn, kind[1])]
+    if not kinds:
+        return False
+
+    for table, columns in SEARCH_COLUMNS.items():
+        for suffix, tokenizer, options in kinds:
+            index = f"{table}_{suffix}"
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (index,)
+            ).fetchone()
+            if not exists:
+                conn.executescript(index_script(table, index, columns, options))
+    return True
+
+
+def supports_tokenizer(conn, tokenizer):
+    try:
+        conn.execute(f"CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='{tokenizer}')")
+        conn.execute("DROP TABLE temp.fts_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def index_script(table, index, columns, options):
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f"new.{column}" for column in columns)
+    old_values = ', '.join(f"old.{column}" for column in columns)
+    return f'''
+        BEGIN;
+        CREATE VIRTUAL TABLE {index} USING fts5(
+            {column_list}, content='{table}', content_rowid='id', {options}
+        );
+        CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {index} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        END;
+        CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {index} ({index}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {index} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END;
+        INSERT INTO {index} ({index}) VALUES ('rebuild');
+        COMMIT;
+    '''
+
+
+@contextmanager
+def deferred_indexing(cursor, table):
+    """Index the rows inserted into table inside the block in one pass at the end.
+
+    Indexing a whole batch with INSERT ... SELECT is several times faster
+    than letting the insert triggers index it a row at a time. The triggers
+    are dropped for the duration and re-created afterwards, so this must run
+    inside a transaction; other connections never see them missing.
+    """
+    indexes = {f"{table}_{suffix}" for suffix, _, _ in INDEX_KINDS}
+    triggers = [
+        (name, sql) for name, sql in cursor.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (table,)
+        ).fetchall()
+        if name[:-len('_insert')] in indexes and name.endswith('_insert')
+    ]
+    last_id = cursor.execute(f"SELECT MAX(id) FROM {table}").fetchone()[0] or 0
+    for name, _ in triggers:
+        cursor.execute(f"DROP TRIGGER {name}")
+
+    yield
+
+    for name, sql in triggers:
+        index = name[:-len('_insert')]
+        column_list = ', '.join(SEARCH_COLUMNS[table])
+        cursor.execute(f'''
+            INSERT INTO {index} (rowid, {column_list})
+            SELECT id, {column_list} FROM {table} WHERE id > ?
+        ''', (last_id,))
+        cursor.execute(sql)
+
+
+def search(db, table, term, limit=None):
+    """Return the rows of table matching term, best matches first.
+
+    limit caps how many rows come back; None returns every match. Raises
+    ValueError for a blank term; the whole table is shown a page at a time
+    instead.
+    """
+    words = term.split()
+    if not words:
+        raise ValueError("Search term is blank")
+    columns = ', '.join(f"t.{column}" for column in RESULT_COLUMNS[table])
+
+    # Substring matching needs every word to be long enough for a trigram;
+    # otherwise match the words as prefixes of indexed words
+    if all(len(word) >= TRIGRAM_MIN_LENGTH for word in words):
+        attempts = [(f"{table}_trigram", ' '.join(quote(word) for word in words))]
+    else:
+        attempts = []
+    attempts.append((f"{table}_fts", ' '.join(quote(word) + '*' for word in words)))
+
+    for index, match in attempts:
+        try:
+            return db.execute(f'''
+                SELECT {columns} FROM {index} f
+                JOIN {table} t ON t.id = f.rowid
+                WHERE {index} MATCH ?
+                ORDER BY bm25({index})
+                LIMIT ?
+            ''', (match, sql_limit(limit))).fetchall()
+        except sqlite3.OperationalError:
+            # Index missing from this database, try the next way of searching
+            continue
+    return like_search(db, table, columns, words, limit)
+
+
+def refine(rows, old_term, new_term):
+    """Narrow the results of old_term down to those matching new_term.
+
+    Returns None when new_term does not just extend old_term, or when either
+    term has a word short enough to be matched as a prefix, since the old rows
+    may then be missing matches.
+    """
+    old_words = old_term.lower().split()
+    new_words = new_term.lower().split()
+    if not old_words or not new_term.lower().startswith(old_term.lower()):
+        return None
+    if any(len(word) < TRIGRAM_MIN_LENGTH for word in old_words + new_words):
+        return None
+    return [
+        row for row in rows
+        if all(any(word in str(value).lower() for value in row[1:] if value is not None) for word in new_words)
+    ]
+
+
+def like_search(db, table, columns, words, limit=None):
+    """Unindexed fallback: every word must appear in one of the columns."""
+    conditions = []
+    params = []
+    for word in words:
+        conditions.append('(' + ' OR '.join(
+            f"LOWER(t.{column}) LIKE ?" for column in SEARCH_COLUMNS[table]
+        ) + ')')
+        params.extend([f"%{word.lower()}%"] * len(SEARCH_COLUMNS[table]))
+    return db.execute(
+        f"SELECT {columns} FROM {table} t WHERE {' AND '.join(conditions)} LIMIT ?",
+        params + [sql_limit(limit)]
+    ).fetchall()
+
+
+def sql_limit(limit):
+    """SQLite reads a negative LIMIT as no limit at all."""
+    return -1 if limit is None else limit
+
+
+def quote(word):
+    """Quote a word as an FTS5 string so punctuation in it is not query syntax."""
+    return '"' + word.replace('"', '""') + '"'
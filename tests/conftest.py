@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, create_tables, migrate
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A Database on a fresh file with every migration applied."""
+    db = Database(str(tmp_path / 'driving_school.db'))
+    create_tables(db)
+    migrate(db.conn)
+    yield db
+    db.close()
@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+import database
+from database import Database, create_tables, delete_rows, migrate
+from scheduling import LESSON_INSERT
+
+
+def test_failed_migration_is_rolled_back(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'driving_school.db'))
+    create_tables(db)
+    monkeypatch.setattr(database, 'MIGRATIONS', database.MIGRATIONS[:1] + [
+        "CREATE TABLE half_done (x); SELECT no_such_function()",
+    ])
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(db.conn)
+
+    assert not db.conn.in_transaction
+    assert db.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert db.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    db.close()
+
+
+def test_duplicates_stop_the_unique_indexes_and_are_named(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'driving_school.db'))
+    create_tables(db)
+    with db.transaction() as cursor:
+        cursor.executemany("INSERT INTO students (first_name, last_name, email, phone) VALUES (?, ?, ?, ?)", [
+            ('Ann', 'Lee', 'ann@x.com', '07000000001'),
+            ('Ann', 'Lee', 'ann@x.com', '07000000002'),
+            ('Bo', 'Ng', None, '07000000003'),
+            ('Cy', 'Ng', None, '07000000003'),
+        ])
+        cursor.executemany(
+            "INSERT INTO instructors (first_name, last_name, license) VALUES (?, ?, ?)",
+            [('Bob', 'Ray', 'ab12'), ('Rob', 'Ray', 'AB12'), ('Sam', 'Tor', 'CD34')]
+        )
+
+    with pytest.raises(database.MigrationError) as error:
+        migrate(db.conn)
+
+    assert str(error.value).splitlines()[1:] == [
+        "students 1, 2 share email 'ann@x.com'",
+        "students 3, 4 share phone '07000000003'",
+        "instructors 1, 2 share license 'ab12'",
+    ]
+    # The migrations before the unique indexes still went in
+    assert db.execute("PRAGMA user_version").fetchone()[0] == 3
+
+    with db.transaction() as cursor:
+        cursor.execute("UPDATE students SET email = 'ann2@x.com' WHERE id = 2")
+        cursor.execute("UPDATE students SET phone = '07000000004' WHERE id = 4")
+        cursor.execute("UPDATE instructors SET license = 'EF56' WHERE id = 2")
+    migrate(db.conn)
+    assert db.execute("PRAGMA user_version").fetchone()[0] == len(database.MIGRATIONS)
+    db.close()
+
+
+def test_delete_rows_keeps_referenced_rows_in_one_transaction(db):
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO students (first_name, last_name, email, phone) VALUES (?, 'Lee', ?, ?)",
+            [(name, f"{name}@x.com", f"0700000000{n}") for n, name in enumerate(('Ann', 'Ben', 'Cat'))]
+        )
+        cursor.execute("INSERT INTO instructors (first_name, last_name, license) VALUES ('Bob', 'Ray', 'AB12')")
+        cursor.execute(LESSON_INSERT, (2, 1, 'Standard', '2030-01-07', '2030-01-07 09:00', '2030-01-07 10:00', 1, 'Booked', 45))
+
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    deleted, blocked = delete_rows(db, 'students', [1, 2, 3, 99])
+    db.conn.set_trace_callback(None)
+
+    assert (deleted, blocked) == ([1, 3], [2])
+    assert db.execute("SELECT id FROM students").fetchall() == [(2,)]
+    assert [sql for sql in statements if sql.split()[0] in ('BEGIN', 'COMMIT', 'ROLLBACK')] == ['BEGIN IMMEDIATE', 'COMMIT']
@@ -0,0 +1,21 @@
+import logging
+import sqlite3
+
+from diagnostics import TracingCursor, trace_log
+
+
+def test_trace_counts_rows_however_they_are_read(caplog):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (x)")
+    conn.executemany("INSERT INTO t VALUES (?)", [(n,) for n in range(5)])
+    query = "SELECT x FROM t"
+
+    with caplog.at_level(logging.DEBUG, logger=trace_log.name):
+        assert len(conn.cursor(TracingCursor).execute(query).fetchall()) == 5
+        assert len(list(conn.cursor(TracingCursor).execute(query))) == 5
+        cursor = conn.cursor(TracingCursor).execute(query)
+        assert cursor.fetchone() == (0,)
+        assert sum(1 for _ in cursor) == 4
+
+    assert [record.getMessage().split()[2] for record in caplog.records] == ['rows=5'] * 3
+    conn.close()
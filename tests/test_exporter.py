@@ -0,0 +1,80 @@
+"""Exports stream in batches, so memory use must not grow with the row count."""
+import csv
+import tracemalloc
+from datetime import date, timedelta
+
+import pytest
+
+from exporter import BATCH_SIZE, COLUMNAR_EXTENSION, LESSON_COLUMNS, LESSONS_QUERY, export_lessons, read_columnar
+
+
+SMALL = 10_000
+LARGE = 50_000
+FIRST_DAY = date(2030, 1, 1)
+
+
+@pytest.fixture
+def db(db):
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO students (first_name, last_name, email, phone) VALUES ('Ann', 'Lee', 'a@x.com', '07000000001')")
+        cursor.execute("INSERT INTO instructors (first_name, last_name, license) VALUES ('Bob', 'Ray', 'AB12')")
+    return db
+
+
+def seed_lessons(db, count):
+    with db.transaction() as cursor:
+        cursor.executemany('''
+            INSERT INTO lessons
+                (student_id, instructor_id, lesson_type, lesson_date, start_time, end_time, duration, status, fee)
+            VALUES (1, 1, 'Standard', ?, ?, ?, 1, 'Booked', 45)
+        ''', [
+            (day, f"{day} {n % 10 + 8:02d}:00", f"{day} {n % 10 + 9:02d}:00")
+            for n in range(count)
+            for day in [(FIRST_DAY + timedelta(days=n // 10)).isoformat()]
+        ])
+
+
+def export_peak(db, path):
+    tracemalloc.start()
+    try:
+        count = export_lessons(db, str(path))
+        return count, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize('extension', ['.csv', COLUMNAR_EXTENSION])
+def test_export_memory_does_not_grow_with_rows(db, tmp_path, extension):
+    seed_lessons(db, SMALL)
+    small_count, small_peak = export_peak(db, tmp_path / f"small{extension}")
+    seed_lessons(db, LARGE - SMALL)
+    large_count, large_peak = export_peak(db, tmp_path / f"large{extension}")
+
+    assert (small_count, large_count) == (SMALL, LARGE)
+    # Five times the rows; a growing buffer would show up as several times
+    # the peak, batch to batch noise as a few percent
+    assert large_peak < small_peak * 1.5, (small_peak, large_peak)
+
+
+def test_columnar_export_reads_back_unchanged(db, tmp_path):
+    seed_lessons(db, BATCH_SIZE * 2 + 7)
+    path = str(tmp_path / f"lessons{COLUMNAR_EXTENSION}")
+    first_day, last_day = FIRST_DAY + timedelta(days=5), FIRST_DAY + timedelta(days=450)
+
+    count = export_lessons(db, path, first_day, last_day)
+
+    expected = db.execute(LESSONS_QUERY, (first_day.isoformat(), (last_day + timedelta(days=1)).isoformat())).fetchall()
+    rows = read_columnar(path)
+    assert next(rows) == LESSON_COLUMNS
+    assert list(rows) == expected
+    assert count == len(expected) > BATCH_SIZE
+
+
+def test_csv_export_has_every_row(db, tmp_path):
+    seed_lessons(db, 25)
+    path = str(tmp_path / 'lessons.csv')
+    export_lessons(db, path)
+    with open(path, newline='', encoding='utf-8') as source:
+        rows = list(csv.reader(source))
+    assert tuple(rows[0]) == LESSON_COLUMNS
+    assert len(rows) == 26
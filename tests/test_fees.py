@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+from fees import RateTable, set_rate
+from scheduling import LESSON_INSERT
+
+
+def book(cursor, day, lesson_type='Standard', status='Booked', fee=45):
+    day = day.isoformat()
+    cursor.execute(LESSON_INSERT, (1, 1, lesson_type, day, f"{day} 09:00", f"{day} 10:00", 1, status, fee))
+
+
+def test_new_rate_reprices_from_today_until_the_next_change(db):
+    today = date.today()
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO students (first_name, last_name, email, phone) VALUES ('Ann', 'Lee', 'a@x.com', '07000000001')")
+        cursor.execute("INSERT INTO instructors (first_name, last_name, license) VALUES ('Bob', 'Ray', 'AB12')")
+        book(cursor, today - timedelta(days=3))
+        book(cursor, today)
+        book(cursor, today + timedelta(days=10))
+        book(cursor, today + timedelta(days=10), status='Cancelled')
+        book(cursor, today + timedelta(days=10), 'Pass Plus', fee=60)
+        book(cursor, today + timedelta(days=30))
+    set_rate(db, 'Standard', 70, today + timedelta(days=20), reprice=False)
+
+    repriced = set_rate(db, 'Standard', 50, today - timedelta(days=5))
+
+    # Only booked Standard lessons from today until the 70 rate takes over
+    assert repriced == 2
+    assert db.execute("SELECT id, fee FROM lessons ORDER BY id").fetchall() == [
+        (1, 45.0), (2, 50.0), (3, 50.0), (4, 45.0), (5, 60.0), (6, 45.0)
+    ]
+
+
+def test_rates_by_date():
+    rates = RateTable([
+        ('Standard', '2030-01-01', 45),
+        ('Standard', '2030-06-01', 50),
+        ('Pass Plus', '2030-01-01', 60),
+    ])
+
+    assert rates.fee('Standard', '2029-12-31', 2) is None
+    assert rates.fee('Standard', date(2030, 1, 1), 2) == 90
+    assert rates.fee('Standard', '2030-05-31 17:00', 1) == 45
+    assert rates.fee('Standard', '2030-06-01', 1) == 50
+    assert rates.fee('Skid Pan', '2030-06-01', 1) is None
@@ -0,0 +1,37 @@
+import csv
+
+from importer import import_csv
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='') as output:
+        csv.writer(output).writerows(rows)
+    return str(path)
+
+
+def test_lesson_fees_come_from_the_rate_table(db, tmp_path):
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO students (first_name, last_name, email, phone) VALUES ('Ann', 'Lee', 'a@x.com', '07000000001')")
+        cursor.execute("INSERT INTO instructors (first_name, last_name, license) VALUES ('Bob', 'Ray', 'AB12')")
+
+    path = write_csv(tmp_path / 'lessons.csv', [
+        ('student_id', 'instructor_id', 'lesson_type', 'lesson_date', 'start_time', 'duration', 'fee'),
+        ('1', '1', 'Standard', '2030-01-07', '09:00', '2', ''),
+        ('1', '1', 'Pass Plus', '2030-01-08', '09:00', '1', '60'),
+        ('1', '1', 'Skid Pan', '2030-01-09', '09:00', '1', ''),
+        ('1', '1', 'Standard', '2030-01-10', '09:00', '1', '10'),
+        ('1', '1', 'Standard', '2030-01-11', '09:00', '1', 'lots'),
+    ])
+    result = import_csv(db, 'lessons', path)
+
+    assert (result.imported, result.rejected) == (2, 3)
+    assert db.execute("SELECT lesson_type, fee FROM lessons ORDER BY lesson_date").fetchall() == [
+        ('Standard', 90.0), ('Pass Plus', 60.0)
+    ]
+    with open(result.reject_path, newline='') as rejects:
+        errors = [row['error'] for row in csv.DictReader(rejects)]
+    assert errors == [
+        "Lesson type 'Skid Pan' has no rate on 2030-01-09",
+        "Fee 10 does not match the rate for that date, which gives 45",
+        "Fee must be a number",
+    ]
@@ -0,0 +1,47 @@
+from names import NameIndex
+
+
+def add(db, index, first_name, last_name):
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO students (first_name, last_name) VALUES (?, ?)", (first_name, last_name))
+    index.add(cursor.lastrowid, first_name, last_name)
+    return cursor.lastrowid
+
+
+def remove(db, index, *ids):
+    with db.transaction() as cursor:
+        cursor.executemany("DELETE FROM students WHERE id = ?", [(person_id,) for person_id in ids])
+    index.remove(*ids)
+
+
+def assert_matches_fresh_load(db, index):
+    fresh = NameIndex.load(db, 'students')
+    assert dict(index) == dict(fresh)
+    assert index.by_first == fresh.by_first
+    assert index.by_last == fresh.by_last
+    assert index.names == fresh.names
+    assert index.shared == fresh.shared
+
+
+def test_incremental_changes_match_a_fresh_load(db):
+    index = NameIndex.load(db, 'students')
+    ann = add(db, index, 'Ann', 'Lee')
+    add(db, index, 'Ben', 'Ng')
+    assert 'Ann Lee' in index
+    assert_matches_fresh_load(db, index)
+
+    # A second Ann Lee gives both of them "(#id)" labels
+    other_ann = add(db, index, 'Ann', 'Lee')
+    assert index.matches('ann') == [f"Ann Lee (#{ann})", f"Ann Lee (#{other_ann})"]
+    assert 'Ann Lee' not in index
+    assert_matches_fresh_load(db, index)
+
+    # The one left goes back to the plain label
+    remove(db, index, ann, 12345)
+    assert index['Ann Lee'] == other_ann
+    assert index.matches('lee') == ['Ann Lee']
+    assert_matches_fresh_load(db, index)
+
+    remove(db, index, *list(index.values()))
+    assert not index and index.matches('') == []
+    assert_matches_fresh_load(db, index)
@@ -0,0 +1,43 @@
+"""The hot lesson queries must seek an index, never scan the lessons table."""
+import pytest
+
+from exporter import LESSONS_QUERY
+from scheduling import CONFLICT_QUERY
+from timetable import DAY_LESSON_CARDS_QUERY
+
+
+def query_plan(db, sql, params):
+    return [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+
+
+def scans_lessons(plan):
+    # The queries alias lessons as l
+    return any(step.split()[:2] in (['SCAN', 'l'], ['SCAN', 'lessons']) for step in plan)
+
+
+@pytest.mark.parametrize('sql, params, index', [
+    (DAY_LESSON_CARDS_QUERY, ('2025-01-06', '2025-01-07'), 'idx_lessons_date'),
+    (LESSONS_QUERY, ('2025-01-01', '2026-01-01'), 'idx_lessons_date'),
+])
+def test_date_range_queries_search_the_date_index(db, sql, params, index):
+    plan = query_plan(db, sql, params)
+    assert any(step.startswith('SEARCH l') and index in step for step in plan), plan
+    assert not scans_lessons(plan), plan
+
+
+def test_conflict_query_searches_both_start_indexes(db):
+    plan = query_plan(db, CONFLICT_QUERY, {
+        'student_id': 1,
+        'instructor_id': 2,
+        'earliest': '2025-01-05 23:00',
+        'start': '2025-01-06 09:00',
+        'end': '2025-01-06 11:00',
+    })
+    assert any('idx_lessons_instructor_start' in step for step in plan), plan
+    assert any('idx_lessons_student_start' in step for step in plan), plan
+    assert not scans_lessons(plan), plan
+
+
+def test_a_full_scan_is_caught(db):
+    plan = query_plan(db, "SELECT * FROM lessons l WHERE l.fee > ?", (0,))
+    assert scans_lessons(plan)
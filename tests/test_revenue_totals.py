@@ -0,0 +1,72 @@
+import pytest
+
+from scheduling import LESSON_INSERT
+
+
+# Each summary table against the same totals computed straight from lessons
+TOTALS = {
+    'revenue_by_day': '''
+        SELECT lesson_date, COUNT(*), TOTAL(duration), TOTAL(fee) FROM lessons
+        GROUP BY lesson_date
+    ''',
+    'revenue_by_type': '''
+        SELECT substr(lesson_date, 1, 7), lesson_type, COUNT(*), TOTAL(duration), TOTAL(fee) FROM lessons
+        GROUP BY 1, 2
+    ''',
+    'revenue_by_instructor': '''
+        SELECT substr(lesson_date, 1, 7), instructor_id, COUNT(*), TOTAL(duration), TOTAL(fee) FROM lessons
+        GROUP BY 1, 2
+    ''',
+}
+
+
+def assert_totals_match(db):
+    for table, query in TOTALS.items():
+        assert sorted(db.execute(f"SELECT * FROM {table}").fetchall()) == sorted(db.execute(query).fetchall()), table
+
+
+@pytest.fixture
+def lessons(db):
+    with db.transaction() as cursor:
+        cursor.execute("INSERT INTO students (first_name, last_name, email, phone) VALUES ('Ann', 'Lee', 'a@x.com', '07000000001')")
+        cursor.executemany(
+            "INSERT INTO instructors (first_name, last_name, license) VALUES (?, ?, ?)",
+            [('Bob', 'Ray', 'AB12'), ('Cat', 'Sim', 'CD34')]
+        )
+        cursor.executemany(LESSON_INSERT, [
+            (1, 1, 'Standard', '2030-01-07', '2030-01-07 09:00', '2030-01-07 11:00', 2, 'Booked', 90),
+            (1, 1, 'Standard', '2030-01-07', '2030-01-07 13:00', '2030-01-07 14:00', 1, 'Booked', 45),
+            (1, 2, 'Pass Plus', '2030-01-31', '2030-01-31 09:00', '2030-01-31 10:00', 1, 'Booked', 60),
+            (1, 2, 'Introductory', '2030-02-01', '2030-02-01 09:00', '2030-02-01 10:00', 1, 'Booked', 30),
+        ])
+    return db
+
+
+def test_totals_follow_inserts(lessons):
+    assert_totals_match(lessons)
+
+
+@pytest.mark.parametrize('change', [
+    "UPDATE lessons SET fee = 100 WHERE id = 1",
+    "UPDATE lessons SET duration = 3 WHERE id = 2",
+    "UPDATE lessons SET lesson_date = '2030-02-01' WHERE id = 3",
+    "UPDATE lessons SET lesson_type = 'Pass Plus' WHERE id = 1",
+    "UPDATE lessons SET instructor_id = 2 WHERE id = 2",
+    "UPDATE lessons SET lesson_date = '2030-03-05', lesson_type = 'Driving Test', instructor_id = 1, fee = 75",
+])
+def test_totals_follow_updates(lessons, change):
+    with lessons.transaction() as cursor:
+        cursor.execute(change)
+    assert_totals_match(lessons)
+
+
+def test_totals_follow_deletes(lessons):
+    with lessons.transaction() as cursor:
+        cursor.execute("DELETE FROM lessons WHERE id IN (1, 3)")
+    assert_totals_match(lessons)
+
+    with lessons.transaction() as cursor:
+        cursor.execute("DELETE FROM lessons")
+    # Emptied groups are removed rather than left at zero
+    for table in TOTALS:
+        assert lessons.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == 0
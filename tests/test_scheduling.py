@@ -0,0 +1,116 @@
+"""Double-booking checks, including bookings racing from several processes."""
+import multiprocessing
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from database import Database
+from scheduling import (
+    LESSON_INSERT, book_lesson, find_conflict, find_series_conflicts, lesson_interval, series_days, suggest_slots
+)
+
+
+PROCESSES = 6
+ATTEMPTS = 40
+PEOPLE = 3
+FIRST_DAY = date(2030, 3, 4)
+
+# Any two lessons of the same instructor or student that overlap
+OVERLAPS_QUERY = '''
+    SELECT COUNT(*) FROM lessons a
+    JOIN lessons b ON a.id < b.id
+        AND (a.instructor_id = b.instructor_id OR a.student_id = b.student_id)
+        AND a.start_time < b.end_time AND b.start_time < a.end_time
+'''
+
+
+def seed_people(db):
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO students (first_name, last_name, email, phone) VALUES (?, ?, ?, ?)",
+            [(f"Student{n}", "Test", f"s{n}@example.com", f"0777000000{n}") for n in range(PEOPLE)]
+        )
+        cursor.executemany(
+            "INSERT INTO instructors (first_name, last_name, license) VALUES (?, ?, ?)",
+            [(f"Instructor{n}", "Test", f"LIC{n}") for n in range(PEOPLE)]
+        )
+
+
+def random_lesson(rng, days=2):
+    """(student_id, instructor_id, start, end, hours) for a lesson in the first few days."""
+    day = FIRST_DAY + timedelta(days=rng.randrange(days))
+    hours = rng.randint(1, 3)
+    start, end = lesson_interval(day, f"{rng.randrange(8, 18):02d}:{rng.choice(['00', '30'])}", hours)
+    return rng.randint(1, PEOPLE), rng.randint(1, PEOPLE), start, end, hours
+
+
+def book_randomly(path, seed, start):
+    # Runs in its own process with its own connection; start is a barrier
+    # that lines the processes up so their bookings really race
+    rng = random.Random(seed)
+    db = Database(path)
+    booked = 0
+    start.wait()
+    try:
+        for _ in range(ATTEMPTS):
+            student_id, instructor_id, start, end, hours = random_lesson(rng)
+            if book_lesson(db, student_id, instructor_id, 'Standard', start, end, hours, 'Booked', 45 * hours) is None:
+                booked += 1
+    finally:
+        db.close()
+    return booked
+
+
+def test_concurrent_bookings_never_overlap(db, tmp_path):
+    seed_people(db)
+    path = str(tmp_path / 'driving_school.db')
+
+    # spawn behaves the same on every platform
+    context = multiprocessing.get_context('spawn')
+    with context.Manager() as manager, context.Pool(PROCESSES) as pool:
+        start = manager.Barrier(PROCESSES)
+        booked = sum(pool.starmap(book_randomly, [(path, seed, start) for seed in range(PROCESSES)]))
+
+    assert db.execute("SELECT COUNT(*) FROM lessons").fetchone()[0] == booked
+    # Two days for three people cannot take every attempt, so clashes were refused
+    assert 0 < booked < PROCESSES * ATTEMPTS
+    assert db.execute(OVERLAPS_QUERY).fetchone()[0] == 0
+
+
+def test_series_conflicts_agree_with_single_checks(db):
+    seed_people(db)
+    rng = random.Random(1)
+    with db.transaction() as cursor:
+        cursor.executemany(LESSON_INSERT, [
+            (student_id, instructor_id, 'Standard', start[:10], start, end, hours, 'Booked', 45 * hours)
+            for student_id, instructor_id, start, end, hours in (random_lesson(rng, days=120) for _ in range(300))
+        ])
+
+    cursor = db.cursor()
+    for _ in range(100):
+        student_id, instructor_id = rng.randint(1, PEOPLE), rng.randint(1, PEOPLE)
+        hours = rng.randint(1, 10)
+        start_time = f"{rng.randrange(7, 20):02d}:00"
+        days = series_days(FIRST_DAY + timedelta(days=rng.randrange(100)), rng.choice([1, 2, 7]), count=rng.randint(1, 20))
+        lessons = [lesson_interval(day, start_time, hours) + (hours, 45 * hours) for day in days]
+
+        expected = []
+        for start, end, *_ in lessons:
+            clash = find_conflict(cursor, student_id, instructor_id, start, end)
+            if clash:
+                expected.append((start, end))
+        assert [clash[:2] for clash in find_series_conflicts(cursor, student_id, instructor_id, lessons)] == expected
+
+
+def test_series_days_stop_at_count_or_until():
+    assert series_days(date(2030, 1, 1), 7, count=3) == [date(2030, 1, 1), date(2030, 1, 8), date(2030, 1, 15)]
+    assert series_days(date(2030, 1, 1), 7, until=date(2030, 1, 14)) == [date(2030, 1, 1), date(2030, 1, 8)]
+    assert series_days(date(2030, 1, 1), 7, until=date(2029, 12, 31)) == []
+
+
+@pytest.mark.parametrize('hours', [0, -2])
+def test_suggest_slots_rejects_empty_lessons(db, hours):
+    seed_people(db)
+    with pytest.raises(ValueError):
+        suggest_slots(db, [1], hours, FIRST_DAY)
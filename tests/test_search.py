@@ -0,0 +1,16 @@
+from search import RESULT_COLUMNS, create_search_index, like_search, search
+
+
+def test_search_stops_at_the_limit(db):
+    with db.transaction() as cursor:
+        cursor.executemany(
+            "INSERT INTO students (first_name, last_name, email, phone) VALUES (?, 'Smith', ?, ?)",
+            [(f"Martin{n}", f"m{n}@example.com", f"07{n:09d}") for n in range(30)]
+        )
+    create_search_index(db.conn)
+    columns = ', '.join(f"t.{column}" for column in RESULT_COLUMNS['students'])
+
+    assert len(search(db, 'students', 'martin')) == 30
+    assert len(search(db, 'students', 'martin', limit=11)) == 11
+    assert len(search(db, 'students', 'ma', limit=11)) == 11
+    assert len(like_search(db, 'students', columns, ['martin'], limit=11)) == 11
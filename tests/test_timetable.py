@@ -0,0 +1,50 @@
+from datetime import date
+
+from timetable import DayCache, LessonCard
+
+
+def card(lesson_id, instructor_id):
+    return LessonCard(lesson_id, 'Standard', 'Booked', 'Ann Lee', 'Bob Ray', 1, 45.0,
+                      '2030-01-07 09:00', '2030-01-07 10:00', 1, instructor_id)
+
+
+def test_cache_evicts_the_least_recently_used_day():
+    cache = DayCache(max_days=3)
+    for day in ('2030-01-07', '2030-01-08', '2030-01-09'):
+        cache.put(day, [day], cache.version)
+    assert cache.get(date(2030, 1, 7)) == ['2030-01-07']
+
+    cache.put('2030-01-10', ['2030-01-10'], cache.version)
+
+    assert list(cache.days) == ['2030-01-09', '2030-01-07', '2030-01-10']
+    assert cache.get('2030-01-08') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_fetch_started_before_an_invalidation_is_not_cached():
+    cache = DayCache()
+    version = cache.version
+    cache.invalidate('2030-01-07')
+    cache.put('2030-01-07', ['stale'], version)
+    assert cache.get('2030-01-07') is None
+
+    cache.put('2030-01-07', ['fresh'], cache.version)
+    assert cache.get('2030-01-07 09:00') == ['fresh']
+
+
+def test_invalidation_drops_only_the_affected_days():
+    cache = DayCache()
+    cache.put('2030-01-07', [card(1, 1)], cache.version)
+    cache.put('2030-01-08', [card(2, 2)], cache.version)
+    cache.put('2030-01-09', [card(3, 1)], cache.version)
+
+    cache.invalidate('2030-01-08')
+    assert list(cache.days) == ['2030-01-07', '2030-01-09']
+
+    cache.invalidate_where(lambda card: card.instructor_id == 1)
+    assert not cache.days
+
+    cache.put('2030-01-10', [], cache.version)
+    version = cache.version
+    cache.clear()
+    assert cache.version == version + 1 and not cache.days
@@ -0,0 +1,27 @@
+from treediff import diff_rows
+
+
+def apply(items, diff):
+    """Apply a diff to a list of (iid, values) the way a Treeview would."""
+    tree = [(iid, values) for iid, values in items.items() if iid not in diff.stale]
+    for index, iid, values in diff.inserts:
+        tree.insert(index, (iid, values))
+    updates = dict(diff.updates)
+    return [(iid, updates.get(iid, values)) for iid, values in tree]
+
+
+def test_only_changed_rows_are_touched():
+    # Values come back from Tk as strings
+    items = {'1': ('Ann', '10'), '2': ('Bob', '20'), '4': ('Dee', '40')}
+    rows = [(1, 'Ann', 10), (3, 'Cal', 30), (4, 'Dee', 41), (5, 'Eve', 50)]
+    diff = diff_rows(items, rows, show_id=False)
+    assert diff.stale == ['2']
+    assert diff.inserts == [(1, '3', ('Cal', 30)), (3, '5', ('Eve', 50))]
+    assert diff.updates == [('4', ('Dee', 41))]
+    assert [iid for iid, _ in apply(items, diff)] == ['1', '3', '4', '5']
+
+
+def test_unchanged_rows_give_an_empty_diff():
+    rows = [(1, 'Ann'), (2, 'Bob')]
+    items = {str(row[0]): tuple(str(value) for value in row) for row in rows}
+    assert diff_rows(items, rows) == ([], [], [])
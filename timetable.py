@@ -0,0 +1,138 @@
+"""Data access for the Time Tables tab."""
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import NamedTuple
+
+
+class LessonCard(NamedTuple):
+    """One lesson as shown on a timetable card."""
+    id: int
+    lesson_type: str
+    status: str
+    student_name: str
+    instructor_name: str
+    duration: int
+    fee: float
+    start_time: str
+    end_time: str
+    student_id: int
+    instructor_id: int
+
+
+# One joined query per day instead of a student and instructor lookup per card
+DAY_LESSON_CARDS_QUERY = '''
+    SELECT l.id AS id,
+        l.lesson_type AS lesson_type,
+        l.status AS status,
+        s.first_name || ' ' || s.last_name AS student_name,
+        i.first_name || ' ' || i.last_name AS instructor_name,
+        l.duration AS duration,
+        l.fee AS fee,
+        substr(l.start_time, 12, 5) AS start_time,
+        substr(l.end_time, 12, 5) AS end_time,
+        l.student_id AS student_id,
+        l.instructor_id AS instructor_id
+    FROM lessons l
+    JOIN students s ON l.student_id = s.id
+    JOIN instructors i ON l.instructor_id = i.id
+    WHERE l.lesson_date >= ? AND l.lesson_date < ?
+    ORDER BY l.start_time, l.lesson_type
+'''
+
+
+def day_bounds(selected_date):
+    """Return the [start, end) ISO strings covering one calendar day."""
+    day = date.fromisoformat(str(selected_date)[:10])
+    return day.isoformat(), (day + timedelta(days=1)).isoformat()
+
+
+def fetch_lesson_cards(cursor, selected_date):
+    """Return the LessonCard rows for every lesson booked on selected_date."""
+    # A range on the raw column lets SQLite use idx_lessons_date
+    cursor.execute(DAY_LESSON_CARDS_QUERY, day_bounds(selected_date))
+    return [LessonCard._make(row) for row in cursor.fetchall()]
+
+
+class DayCache:
+    """Least recently used cache of the lesson cards for each day.
+
+    Holds at most max_days days. Anything that changes lessons must
+    invalidate the days it touched; version goes up on every invalidation,
+    so a fetch that started before one can tell its result is out of date.
+    """
+    def __init__(self, max_days=60):
+        self.max_days = max_days
+        self.days = OrderedDict()
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, day):
+        """Return the cached cards for day, or None."""
+        day = str(day)[:10]
+        cards = self.days.get(day)
+        if cards is None:
+            self.misses += 1
+            return None
+        self.days.move_to_end(day)
+        self.hits += 1
+        return cards
+
+    def put(self, day, cards, version):
+        """Cache cards fetched when the cache was at version, unless that is stale."""
+        if version != self.version:
+            return
+        self.days[str(day)[:10]] = cards
+        self.days.move_to_end(str(day)[:10])
+        while len(self.days) > self.max_days:
+            self.days.popitem(last=False)
+
+    def invalidate(self, *days):
+        self.version += 1
+        for day in days:
+            self.days.pop(str(day)[:10], None)
+
+    def invalidate_where(self, predicate):
+        """Drop every day with a card for which predicate(card) is true."""
+        self.version += 1
+        for day in [day for day, cards in self.days.items() if any(predicate(card) for card in cards)]:
+            del self.days[day]
+
+    def clear(self):
+        self.version += 1
+        self.days.clear()
+
+
+# Lessons per day for a range of dates, from the totals the lesson triggers
+# keep (see migration 3), so no lessons are scanned
+DAY_COUNTS_QUERY = '''
+    SELECT lesson_date, lessons FROM revenue_by_day
+    WHERE lesson_date >= ? AND lesson_date < ?
+'''
+
+# Calendar tag for days with at least this many lessons, busiest first
+DENSITY_TAGS = [
+    (6, 'lessons_high'),
+    (3, 'lessons_medium'),
+    (1, 'lessons_low'),
+]
+
+
+def month_bounds(year, month):
+    """Return the [start, end) ISO strings covering one month."""
+    first_day = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return first_day.isoformat(), next_month.isoformat()
+
+
+def fetch_day_counts(cursor, year, month):
+    """Return {date: number of lessons} for the days in a month that have any."""
+    cursor.execute(DAY_COUNTS_QUERY, month_bounds(year, month))
+    return {date.fromisoformat(day): count for day, count in cursor.fetchall()}
+
+
+def density_tag(count):
+    for minimum, tag in DENSITY_TAGS:
+        if count >= minimum:
+            return tag
+    return None
@@ -0,0 +1,35 @@
+"""Work out the edits that bring a Treeview's rows up to date.
+
+Kept apart from the widget code so the diff can be tested and timed without
+Tk. Items are keyed by primary key, so a refresh only touches the rows that
+were added, changed or removed.
+"""
+from typing import NamedTuple
+
+
+class TreeDiff(NamedTuple):
+    stale: list    # item ids to delete
+    inserts: list  # (index, item id, values), applied in order after the deletes
+    updates: list  # (item id, values) for items whose values changed
+
+
+def diff_rows(items, rows, show_id=True):
+    """Compare the tree's items with freshly read rows.
+
+    items maps each item id to its displayed values, in tree order; rows are
+    ordered by id with the id first. show_id=False leaves the id out of the
+    values. Once the stale items are gone, what is left is already in id
+    order, so each new row is inserted at its final index.
+    """
+    wanted = {str(row[0]) for row in rows}
+    stale = [iid for iid in items if iid not in wanted]
+    inserts = []
+    updates = []
+    for index, row in enumerate(rows):
+        iid = str(row[0])
+        values = row if show_id else row[1:]
+        if iid not in items:
+            inserts.append((index, iid, values))
+        elif [str(value) for value in items[iid]] != [str(value) for value in values]:
+            updates.append((iid, values))
+    return TreeDiff(stale, inserts, updates)
@@ -1,12 +1,31 @@
+import time
+# Startup is measured from here, before the GUI libraries are imported
+STARTED = time.perf_counter()
+
 import tkinter as tk
+import logging
 import re 
 import sqlite3
 import PIL.Image
-from tkinter import ttk, messagebox, Canvas
+from tkinter import ttk, messagebox, filedialog, Canvas
 from PIL import Image, ImageTk
 from tkcalendar import DateEntry,Calendar  # Import DateEntry from tkcalendar
 from datetime import datetime, date
+from typing import NamedTuple
 from PIL import Image, ImageTk
+from timetable import DENSITY_TAGS, DayCache, density_tag, fetch_day_counts, fetch_lesson_cards
+from database import Database, QueryExecutor, create_tables, delete_rows, migrate
+from search import SEARCH_LIMIT, create_search_index, refine, search
+from diagnostics import setup_logging, startup_benchmark
+from scheduling import MAX_LESSON_HOURS, MAX_SERIES_LESSONS, START_TIMES, book_lesson, book_series, lesson_interval, series_days, suggest_slots
+from importer import EMAIL_PATTERN, LICENSE_PATTERN, import_csv
+from fees import RateTable, set_rate
+from names import MATCH_LIMIT, NameIndex
+from treediff import diff_rows
+from exporter import COLUMNAR_EXTENSION, export_lessons, export_roster
+from reports import PERIODS, instructor_utilisation, report_years, revenue_by_period, revenue_by_type, year_range
+
+log = logging.getLogger('driving_school')
 
 class DrivingSchoolApp:
     def __init__(self, root):
@@ -14,10 +33,6 @@ class DrivingSchoolApp:
         self.root.title("Pass IT Driving School Management System")
         self.root.geometry("1200x700")
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing) 
-        self.notebook = ttk.Notebook(root)
-        self.notebook.pack(fill="both", expand=True)
-
-
 
         try:
             icon = PIL.Image.open("logo.png")  # Make sure to have logo.png in your project directory
@@ -25,7 +40,7 @@ class DrivingSchoolApp:
             icon_photo = ImageTk.PhotoImage(icon)
             self.root.iconphoto(True, icon_photo)
         except Exception as e:
-            print(f"Error loading icon: {e}")
+            log.warning("Error loading icon: %s", e)
 
         # Create header frame for logo and title
         self.header_frame = tk.Frame(root, bg='#f4f6f9')
@@ -57,89 +72,146 @@ class DrivingSchoolApp:
             self.title_label.pack(side='left', padx=10)
             
         except Exception as e:
-            print(f"Error loading logo in header: {e}")
+            log.warning("Error loading logo in header: %s", e)
 
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill="both", expand=True)
 
-        # Show loading screen first
+        # Show loading screen first, then start up as soon as it has drawn
         self.loading = show_loading_screen(root)
-        self.root.after(1600, self.initialize_app)
+        self.root.after_idle(self.initialize_app)
 
+        # Hourly rates by lesson type and date, loaded at startup and again
+        # whenever a rate is changed
+        self.rates = RateTable()
 
-        self.pay_rate_map = {
-            'Introductory': 30,  # £30 per hour
-            'Standard': 45,      # £45 per hour
-            'Pass Plus': 60,     # £60 per hour
-            'Driving Test': 75   # £75 per hour
-        }
+        # Dropdown label -> primary key, loaded by the populate_*_dropdown
+        # methods and kept current as people are added and deleted
+        self.student_ids = NameIndex()
+        self.instructor_ids = NameIndex()
+
+        # How long typing must pause before the search boxes run a query
+        self.search_delay_ms = 300
+
+        # Cards for recently viewed timetable days, so going back to one skips the query
+        self.timetable_cache = DayCache()
+
+        # Tabs not built yet: notebook tab id -> (frame, method that fills it in)
+        self.pending_tabs = {}
 
     def on_closing(self):
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
-            self.root.destroy()
+            self.shutdown()
+
+    def shutdown(self):
+        if hasattr(self, 'queries'):
+            self.queries.close()
+        if hasattr(self, 'db'):
+            self.db.close()
+        self.root.destroy()
 
 
     def initialize_app(self):
-        # Database Setup
-        self.create_database()
+        # The splash screen shows each stage as it runs, and the main window
+        # opens as soon as the first tab can be used
+        stages = [
+            ("Opening database", self.create_database),
+            ("Updating database", lambda: migrate(self.db.conn)),
+            ("Building search index", lambda: create_search_index(self.db.conn)),
+            ("Starting workers", self.start_queries),
+            ("Loading names and rates", self.load_dropdowns),
+            ("Building tabs", self.create_tabs),
+        ]
+        for number, (text, stage) in enumerate(stages):
+            self.loading.set_progress(number * 100 / len(stages), f"{text}...")
+            stage_started = time.perf_counter()
+            try:
+                stage()
+            except Exception as e:
+                # Without this the splash screen would stay up over a hidden window
+                log.exception("Startup stage '%s' failed", text)
+                self.loading.close()
+                messagebox.showerror("Startup Error", f"{text} failed:\n\n{e}")
+                self.shutdown()
+                return
+            log.debug("Startup stage '%s' took %.1f ms", text, (time.perf_counter() - stage_started) * 1000)
+
+        self.loading.set_progress(100, "Ready")
+        self.loading.show_main_window()
+        self.root.after_idle(self.startup_finished)
+
+    def start_queries(self):
+        # Everything after startup runs off the main loop
+        self.queries = QueryExecutor(self.root)
+
+    def load_dropdowns(self):
+        # Runs on the reader threads while the first tab is built
+        self.populate_student_dropdown()
+        self.populate_instructor_dropdown()
+        self.load_rates()
+
+    def load_rates(self):
+        def show_rates(rates):
+            self.rates = rates
+            if hasattr(self, 'lesson_type'):
+                self.lesson_type['values'] = rates.types
+                self.update_pay_rate()
+
+        self.queries.submit(
+            RateTable.load,
+            on_done=show_rates,
+            on_error=self.show_database_error,
+            key='rates'
+        )
 
-        # Create Notebook (Tabbed Interface)
-            # Create Tabs
-        self.create_student_tab()
-        self.create_instructor_tab()
-        self.create_lesson_tab()
-        self.create_timetable_tab()
+    def create_tabs(self):
+        # Every tab gets an empty frame now; only the first is filled in, the
+        # others are built the first time they are selected
+        tabs = [
+            ("Students", 'Student.TFrame', self.create_student_tab),
+            ("Instructors", 'Instructor.TFrame', self.create_instructor_tab),
+            ("Lessons", 'Lesson.TFrame', self.create_lesson_tab),
+            ("Time Tables", 'TFrame', self.create_timetable_tab),
+            ("Reports", 'Reports.TFrame', self.create_reports_tab),
+        ]
+        for text, style, build in tabs:
+            frame = ttk.Frame(self.notebook, style=style)
+            self.notebook.add(frame, text=text)
+            self.pending_tabs[str(frame)] = (frame, build)
+
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.on_tab_changed()
+
+    def on_tab_changed(self, event=None):
+        tab = self.notebook.select()
+        if tab in self.pending_tabs:
+            frame, build = self.pending_tabs.pop(tab)
+            build_started = time.perf_counter()
+            build(frame)
+            log.debug("Built the %s tab in %.1f ms", self.notebook.tab(tab, 'text'), (time.perf_counter() - build_started) * 1000)
+
+        # Report totals change with every booking, so reload whenever shown
+        if tab == str(getattr(self, 'reports_tab', '')):
+            self.update_reports()
+
+    def startup_finished(self):
+        # Counted once the main window is actually on screen
+        self.root.wait_visibility()
+        elapsed = time.perf_counter() - STARTED
+        log.info("Started in %.0f ms", elapsed * 1000)
+        if startup_benchmark():
+            print(f"Startup: {elapsed * 1000:.0f} ms to the first interactive frame")
+            self.shutdown()
 
     def create_database(self):
-        # Create SQLite database and tables
-        self.conn = sqlite3.connect('driving_school.db')
-        self.cursor = self.conn.cursor()
-
-        # Students Table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT,
-                last_name TEXT,
-                email TEXT,
-                phone TEXT
-            )
-        ''')
-
-        # Instructors Table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS instructors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                first_name TEXT,
-                last_name TEXT,
-                email TEXT,
-                phone TEXT,
-                license TEXT
-            )
-        ''')
+        # Open the shared connection every tab uses; migrations and the search
+        # index are separate startup stages
+        self.db = Database('driving_school.db')
 
- 
-        # Lessons Table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS lessons (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER, 
-                instructor_id INTEGER,  
-                lesson_type TEXT,
-                lesson_date TEXT,
-                duration INTEGER,
-                status TEXT,
-                fee REAL,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                FOREIGN KEY (instructor_id) REFERENCES instructors (id)
-            )
-        ''')
-        self.conn.commit()
+        create_tables(self.db)
 
-    def create_timetable_tab(self):
-        # Create the tab
-        self.timetable_tab = ttk.Frame(self.notebook)
-        self.notebook.add(self.timetable_tab, text='Time Tables')
+    def create_timetable_tab(self, timetable_tab):
+        self.timetable_tab = timetable_tab
 
         # Colors for styling
         colors = {
@@ -182,93 +254,264 @@ class DrivingSchoolApp:
         container.pack(fill='both', expand=True)
 
         # Create canvas with scrollbar
-        self.canvas = Canvas(container, bg=colors['background'])
-        scrollbar = ttk.Scrollbar(container, orient="vertical", command=self.canvas.yview)
-
-        self.scrollable_frame = ttk.Frame(self.canvas, style="ScrollableFrame.TFrame")
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
-
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas = Canvas(container, bg=colors['background'], highlightthickness=0)
+        scrollbar = ttk.Scrollbar(container, orient="vertical")
 
         # Pack scrolling components
         scrollbar.pack(side="right", fill="y")
         self.canvas.pack(side="left", fill="both", expand=True)
 
+        # Only the cards in view are built; they are reused as the list scrolls
+        self.lesson_cards = VirtualCardList(
+            self.canvas, scrollbar,
+            build_card=self.create_lesson_card,
+            fill_card=self.fill_lesson_card
+        )
+
         # Bind calendar selection to update lessons
         self.cal.bind("<<CalendarSelected>>", self.update_lessons)
 
+        # Days are shaded by how many lessons they have; counts are cached
+        # per month and the months either side are fetched ahead of paging
+        density_colors = {
+            'lessons_low': '#d6eaf8',
+            'lessons_medium': '#85c1e9',
+            'lessons_high': '#2e86c1'
+        }
+        for _, tag in DENSITY_TAGS:
+            self.cal.tag_config(tag, background=density_colors[tag], foreground='black')
+        self.day_counts = {}
+        self.day_count_events = {}
+        self.cal.bind("<<CalendarMonthChanged>>", self.show_day_counts)
+
         # Initial load of lessons
         self.update_lessons()
+        self.show_day_counts()
 
-    def create_lesson_card(self, lesson_data):
+    def create_lesson_card(self, parent):
         # Create card frame
-        card = ttk.Frame(self.scrollable_frame, style="Card.TFrame", padding=10)
-        card.pack(fill='x', padx=10, pady=5)
+        card = ttk.Frame(parent, style="Card.TFrame", padding=10)
 
         # Add border and background color
         card.configure(relief="solid", borderwidth=1)
 
-        try:
-            # Fetch related data
-            self.cursor.execute("SELECT first_name || ' ' || last_name FROM students WHERE id = ?", (lesson_data['student_id'],))
-            student_name = self.cursor.fetchone()[0]
+        # Empty labels, filled in by fill_lesson_card for whichever lesson the card shows
+        labels = {
+            'lesson_type': ttk.Label(card, font=('Helvetica', 14, 'bold')),
+            'status': ttk.Label(card, font=('Helvetica', 12)),
+            'student': ttk.Label(card, font=('Helvetica', 12)),
+            'instructor': ttk.Label(card, font=('Helvetica', 12)),
+            'duration': ttk.Label(card, font=('Helvetica', 12)),
+            'fee': ttk.Label(card, font=('Helvetica', 12))
+        }
+        labels['lesson_type'].grid(row=0, column=0, sticky='w')
+        labels['status'].grid(row=0, column=1, sticky='e')
+        labels['student'].grid(row=1, column=0, sticky='w')
+        labels['instructor'].grid(row=1, column=1, sticky='e')
+        labels['duration'].grid(row=2, column=0, sticky='w')
+        labels['fee'].grid(row=2, column=1, sticky='e')
+        card.grid_columnconfigure(1, weight=1)
+
+        return card, labels
+
+    def fill_lesson_card(self, labels, lesson):
+        # Add details to card
+        labels['lesson_type'].config(text=f"Lesson Type: {lesson.lesson_type}")
+        labels['status'].config(text=f"Status: {lesson.status}")
+        labels['student'].config(text=f"Student: {lesson.student_name}")
+        labels['instructor'].config(text=f"Instructor: {lesson.instructor_name}")
+        labels['duration'].config(text=f"Time: {lesson.start_time} - {lesson.end_time} ({lesson.duration} hours)")
+        labels['fee'].config(text=f"Fee: £{lesson.fee:.2f}")
 
-            self.cursor.execute("SELECT first_name || ' ' || last_name FROM instructors WHERE id = ?", (lesson_data['instructor_id'],))
-            instructor_name = self.cursor.fetchone()[0]
+    def update_lessons(self, event=None):
+        selected_date = self.cal.get_date()
+        self.lessons_title.config(text=f"Lessons for {selected_date}")
 
-            # Add details to card
-            ttk.Label(card, text=f"Lesson Type: {lesson_data['lesson_type']}", font=('Helvetica', 14, 'bold')).grid(row=0, column=0, sticky='w')
-            ttk.Label(card, text=f"Status: {lesson_data['status']}", font=('Helvetica', 12)).grid(row=0, column=1, sticky='e')
-            ttk.Label(card, text=f"Student: {student_name}", font=('Helvetica', 12)).grid(row=1, column=0, sticky='w')
-            ttk.Label(card, text=f"Instructor: {instructor_name}", font=('Helvetica', 12)).grid(row=1, column=1, sticky='e')
-            ttk.Label(card, text=f"Duration: {lesson_data['duration']} hours", font=('Helvetica', 12)).grid(row=2, column=0, sticky='w')
-            ttk.Label(card, text=f"Fee: £{lesson_data['fee']:.2f}", font=('Helvetica', 12)).grid(row=2, column=1, sticky='e')
+        cache = self.timetable_cache
+        lessons = cache.get(selected_date)
+        log.debug("Timetable cache %s for %s (%d hits, %d misses)",
+                  'miss' if lessons is None else 'hit', selected_date, cache.hits, cache.misses)
+        if lessons is not None:
+            # Drop any fetch still running for a previously picked date
+            self.queries.cancel('timetable')
+            self.show_lesson_cards(lessons)
+            return
 
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error accessing database: {str(e)}")
+        def fetched(lessons):
+            cache.put(selected_date, lessons, version)
+            self.show_lesson_cards(lessons)
+
+        # Fetch every card for the day, names included, in one query. Picking
+        # another date before it returns replaces it, so stale days never render.
+        version = cache.version
+        self.queries.submit(
+            lambda db: fetch_lesson_cards(db.cursor(), selected_date),
+            on_done=fetched,
+            on_error=self.show_database_error,
+            key='timetable'
+        )
 
-    def update_lessons(self, event=None):
-        # Clear previous lessons
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+    def lessons_changed(self, *days):
+        # Drop the cached cards for the days given, or for every day, then
+        # refresh the calendar shading and the day on display
+        if days:
+            self.timetable_cache.invalidate(*days)
+        else:
+            self.timetable_cache.clear()
+        if not hasattr(self, 'cal'):
+            # Timetable not built yet; it loads fresh when first shown
+            return
+        self.refresh_day_counts()
+        if not days or self.cal.get_date() in days:
+            self.update_lessons()
+
+    def show_day_counts(self, event=None):
+        month, year = self.cal.get_displayed_month()
+        for offset in (0, -1, 1):
+            # Shown month first, then its neighbours
+            y, m = divmod(year * 12 + month - 1 + offset, 12)
+            self.load_day_counts(y, m + 1)
+
+    def load_day_counts(self, year, month):
+        if (year, month) in self.day_counts:
+            return
+        # Marked as loading so paging back and forth queries each month once
+        self.day_counts[(year, month)] = None
+        self.queries.submit(
+            lambda db: fetch_day_counts(db.cursor(), year, month),
+            on_done=lambda counts: self.tag_day_counts(year, month, counts),
+            on_error=lambda e: self.day_count_failed(year, month, e),
+            key=('day_counts', year, month)
+        )
 
-        selected_date = self.cal.get_date()
-        self.lessons_title.config(text=f"Lessons for {selected_date}")
+    def day_count_failed(self, year, month, error):
+        # Try again next time the month is shown
+        self.day_counts.pop((year, month), None)
+        log.warning("Could not load lesson counts for %d-%02d: %s", year, month, error)
+
+    def tag_day_counts(self, year, month, counts):
+        self.day_counts[(year, month)] = counts
+        for event_id in self.day_count_events.pop((year, month), []):
+            self.cal.calevent_remove(event_id)
+        self.day_count_events[(year, month)] = [
+            self.cal.calevent_create(day, f"{count} lesson{'s' if count != 1 else ''}", density_tag(count))
+            for day, count in counts.items()
+        ]
 
-        try:
-            # Fetch lessons from the database
-            self.cursor.execute("SELECT * FROM lessons WHERE date(lesson_date) = date(?) ORDER BY lesson_type", (selected_date,))
-            lessons = self.cursor.fetchall()
+    def refresh_day_counts(self):
+        # Lessons changed: forget every month and reload the ones in view
+        self.day_counts.clear()
+        self.show_day_counts()
 
-            if not lessons:
-                ttk.Label(self.scrollable_frame, text="No lessons scheduled for this date", font=('Helvetica', 10, 'italic')).pack(pady=20)
-            else:
-                for lesson in lessons:
-                    lesson_dict = {
-                        'id': lesson[0],
-                        'student_id': lesson[1],
-                        'instructor_id': lesson[2],
-                        'lesson_type': lesson[3],
-                        'lesson_date': lesson[4],
-                        'duration': lesson[5],
-                        'status': lesson[6],
-                        'fee': lesson[7]
-                    }
-                    self.create_lesson_card(lesson_dict)
-
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error accessing database: {str(e)}")
+    def show_lesson_cards(self, lessons):
+        self.lesson_cards.set_rows(lessons, empty_message="No lessons scheduled for this date")
+
+    def show_database_error(self, error):
+        messagebox.showerror("Database Error", f"An error occurred: {str(error)}")
+
+
+    def create_reports_tab(self, reports_tab):
+        self.reports_tab = reports_tab
+
+        style = ttk.Style()
+        colors = {
+            'background': '#f4f6f9',
+            'text_dark': '#2c3e50',
+        }
+        style.configure('Reports.TFrame', background=colors['background'])
+
+        main_frame = tk.Frame(reports_tab, bg=colors['background'], bd=0)
+        main_frame.pack(expand=True, fill="both", padx=20, pady=20)
+
+        title_label = tk.Label(main_frame, text="Reports", font=('Segoe UI', 18, 'bold'), bg=colors['background'], fg=colors['text_dark'])
+        title_label.pack(pady=(0, 20), anchor='center')
+
+        # Year, month and grouping controls
+        controls = tk.Frame(main_frame, bg=colors['background'])
+        controls.pack(pady=5, fill='x')
+
+        self.report_year = ttk.Combobox(controls, font=('Segoe UI', 12), width=8, state='readonly')
+        self.report_month = ttk.Combobox(
+            controls, font=('Segoe UI', 12), width=8, state='readonly',
+            values=['All'] + [date(2000, month, 1).strftime('%b') for month in range(1, 13)]
+        )
+        self.report_period = ttk.Combobox(controls, font=('Segoe UI', 12), width=8, state='readonly', values=list(PERIODS))
+        self.report_month.set('All')
+        self.report_period.set('Month')
+
+        for label_text, widget in (("Year:", self.report_year), ("Month:", self.report_month), ("Group by:", self.report_period)):
+            ttk.Label(controls, text=label_text, style='TLabel').pack(side='left', padx=(10, 5))
+            widget.pack(side='left')
+            widget.bind("<<ComboboxSelected>>", self.update_reports)
+
+        refresh_btn = ttk.Button(controls, text="Refresh", command=self.update_reports, style='Search.TButton')
+        refresh_btn.pack(side='right', padx=5)
+
+        def report_tree(parent, columns, widths):
+            frame = tk.Frame(parent, bg='white', bd=1, relief='solid')
+            scrollbar = ttk.Scrollbar(frame, orient="vertical")
+            scrollbar.pack(side="right", fill="y")
+            tree = ttk.Treeview(frame, columns=columns, show="headings", yscrollcommand=scrollbar.set, height=8)
+            tree.pack(fill="both", expand=True)
+            scrollbar.config(command=tree.yview)
+            for col, width in zip(columns, widths):
+                tree.heading(col, text=col)
+                tree.column(col, width=width, anchor='center')
+            return frame, tree
+
+        period_frame, self.period_tree = report_tree(
+            main_frame, ('Period', 'Lessons', 'Hours', 'Revenue'), (150, 100, 100, 120))
+        period_frame.pack(pady=10, fill='both', expand=True)
+
+        bottom_frame = tk.Frame(main_frame, bg=colors['background'])
+        bottom_frame.pack(fill='both', expand=True)
+
+        type_frame, self.type_tree = report_tree(
+            bottom_frame, ('Lesson Type', 'Lessons', 'Hours', 'Revenue'), (120, 70, 70, 100))
+        type_frame.pack(side='left', fill='both', expand=True, padx=(0, 5))
+
+        instructor_frame, self.utilisation_tree = report_tree(
+            bottom_frame, ('Instructor', 'Lessons', 'Hours', 'Revenue', 'Utilisation'), (140, 70, 70, 100, 90))
+        instructor_frame.pack(side='left', fill='both', expand=True, padx=(5, 0))
+
+    def update_reports(self, event=None):
+        year = self.report_year.get()
+        month = self.report_month.current()
+        period = self.report_period.get()
+
+        def load(db):
+            years = report_years(db)
+            selected = int(year) if year in years else (int(years[0]) if years else date.today().year)
+            first_day, last_day = year_range(selected, month if month > 0 else None)
+            return (
+                years, selected,
+                revenue_by_period(db, first_day, last_day, period),
+                revenue_by_type(db, first_day, last_day),
+                instructor_utilisation(db, first_day, last_day)
+            )
+
+        self.queries.submit(load, on_done=self.show_reports, on_error=self.show_database_error, key='reports')
+
+    def show_reports(self, results):
+        years, selected, periods, types, instructors = results
+        self.report_year.config(values=years)
+        self.report_year.set(str(selected))
+
+        for tree, rows in ((self.period_tree, periods), (self.type_tree, types)):
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert("", "end", values=(row.label, row.lessons, f"{row.hours:g}", f"£{row.revenue:.2f}"))
+
+        self.utilisation_tree.delete(*self.utilisation_tree.get_children())
+        for row in instructors:
+            self.utilisation_tree.insert("", "end", values=(
+                row.instructor, row.lessons, f"{row.hours:g}", f"£{row.revenue:.2f}", f"{row.utilisation:.0%}"
+            ))
 
 
 # student---------------------
-    def create_student_tab(self):
+    def create_student_tab(self, student_tab):
             # Student Management Tab
-            student_tab = ttk.Frame(self.notebook, style='Student.TFrame')
-            self.notebook.add(student_tab, text="Students")
 
             # Initialize entry widgets
             self.student_first_name = tk.Entry(None)
@@ -346,6 +589,18 @@ class DrivingSchoolApp:
             )
             self.student_search_entry.pack(side="left", padx=10, fill='x', expand=True)
             self.student_search_entry.bind("<Return>", lambda event: self.search_students())
+            self.student_live_search = LiveSearch(
+                self.student_search_entry,
+                run_query=lambda term, limit, on_done: self.queries.submit(
+                    lambda db: search(db, 'students', term, limit),
+                    on_done=on_done,
+                    on_error=self.show_database_error,
+                    key='student_tree'
+                ),
+                show_results=self.show_student_results,
+                on_clear=self.view_students,
+                delay_ms=self.search_delay_ms
+            )
 
             search_btn = ttk.Button(
                 search_frame, 
@@ -430,6 +685,22 @@ class DrivingSchoolApp:
             )
             delete_btn.pack(side='right', padx=10, pady=2)
 
+            import_btn = ttk.Button(
+                delete_frame,
+                text="Import CSV",
+                command=lambda: self.import_file('students'),
+                style='Search.TButton'
+            )
+            import_btn.pack(side='left', padx=10, pady=2)
+
+            export_btn = ttk.Button(
+                delete_frame,
+                text="Export",
+                command=lambda: self.export_file('students'),
+                style='Search.TButton'
+            )
+            export_btn.pack(side='left', padx=(0, 10), pady=2)
+
             self.student_count_label = tk.Label(
                 delete_frame,
                 text="Total Students: 0",
@@ -474,50 +745,51 @@ class DrivingSchoolApp:
             vertical_scrollbar.config(command=self.student_tree.yview)
             horizontal_scrollbar.config(command=self.student_tree.xview)
 
+            # Rows are loaded a page at a time as the tree is scrolled
+            self.student_pages = LazyTree(
+                self.student_tree, vertical_scrollbar, self.queries, key='student_tree',
+                fetch_page=lambda db, after_id, limit: db.execute(
+                    "SELECT * FROM students WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+                ).fetchall(),
+                count=lambda db: db.execute("SELECT COUNT(*) FROM students").fetchone()[0],
+                on_count=lambda total: self.student_count_label.config(text=f"Total Students: {total}"),
+                on_error=self.show_database_error
+            )
+            self.student_tree.bind(
+                "<Double-1>", lambda event: self.show_more_results(event, self.student_tree, self.student_live_search)
+            )
+
             # Populate initial data
             self.view_students()
 
     def search_students(self):
-        search_term = self.student_search_entry.get().strip().lower()
-        
-        # Clear the treeview
-        for item in self.student_tree.get_children():
-            self.student_tree.delete(item)
-        
-        try:
-            conn = sqlite3.connect('driving_school.db')
-            cursor = conn.cursor()
-            
-            # Execute the query
-            cursor.execute("""
-                SELECT * FROM students 
-                WHERE LOWER(first_name) LIKE ? OR 
-                    LOWER(last_name) LIKE ? OR 
-                    LOWER(email) LIKE ? OR 
-                    LOWER(phone) LIKE ?
-            """, (f'%{search_term}%', f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
-            
-            students = cursor.fetchall()
+        # Ranked full-text search over names, email and phone, run now rather
+        # than after the typing delay
+        self.student_live_search.run(force=True)
 
+    def show_student_results(self, students, complete=True):
+        # Search results replace the paged list until the next reset
+        self.student_pages.stop()
 
-            if students:
-                # Populate the treeview with results
-                for student in students:
-                    self.student_tree.insert("", "end", values=student)
-            else:
-                # If no results are found
-                self.student_tree.insert("", "end", values=("No results found", "", "", ""), tags=("placeholder",))
-            
-            self.student_tree.tag_configure("placeholder", foreground="red", font=("Arial", 12, "italic"))
-            
-               # Update the student count label
+        # Clear the treeview
+        self.student_tree.delete(*self.student_tree.get_children())
 
-            self.student_count_label.config(text=f"Total Students: {len(students)}")
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
-        finally:
-            conn.close()
+        if students:
+            # Populate the treeview with results
+            for student in students:
+                self.student_tree.insert("", "end", values=student)
+        else:
+            # If no results are found
+            self.student_tree.insert("", "end", values=("No results found", "", "", ""), tags=("placeholder",))
+        if not complete:
+            # Searches stop at a page of matches; double-clicking this row fetches the next
+            self.student_tree.insert("", "end", values=("More results...", "", "", ""), tags=("more",))
+        
+        self.student_tree.tag_configure("placeholder", foreground="red", font=("Arial", 12, "italic"))
+        self.student_tree.tag_configure("more", foreground="blue", font=("Arial", 10, "italic"))
+        
+        # Update the student count label
+        self.student_count_label.config(text=f"Total Students: {len(students)}{'' if complete else '+'}")
 
 
 
@@ -542,34 +814,35 @@ class DrivingSchoolApp:
             return
 
 
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, email):
+        if not re.match(EMAIL_PATTERN, email):
             messagebox.showwarning("Invalid Input", "Please enter a valid email address")
             return
         
-        try:
-            conn = sqlite3.connect('driving_school.db')
-            cursor = conn.cursor()
-            
-            # Check for duplicate email
-            cursor.execute("SELECT * FROM students WHERE email = ?", (email,))
-            if cursor.fetchone():
-                messagebox.showwarning("Duplicate Entry", "A student with this email already exists")
-                return
-            
-            # Check for duplicate phone
-            cursor.execute("SELECT * FROM students WHERE phone = ?", (phone,))
-            if cursor.fetchone():
-                messagebox.showwarning("Duplicate Entry", "A student with this phone number already exists")
+        def insert(db):
+            # Returns the new student's id, or None and the duplicate message
+            with db.transaction() as cursor:
+                # The unique email and phone indexes turn a duplicate into a no-op
+                cursor.execute("""
+                    INSERT INTO students (first_name, last_name, email, phone)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                """, (first_name, last_name, email, phone))
+                if cursor.rowcount > 0:
+                    return cursor.lastrowid, None
+
+                # Only a rejected insert needs to know which field clashed
+                cursor.execute("SELECT email = ? FROM students WHERE email = ? OR phone = ? LIMIT 1", (email, email, phone))
+                row = cursor.fetchone()
+                if row and row[0]:
+                    return None, "A student with this email already exists"
+                return None, "A student with this phone number already exists"
+
+        def inserted(result):
+            student_id, duplicate = result
+            if duplicate:
+                messagebox.showwarning("Duplicate Entry", duplicate)
                 return
-            
-            cursor.execute("""
-                INSERT INTO students (first_name, last_name, email, phone)
-                VALUES (?, ?, ?, ?)
-            """, (first_name, last_name, email, phone))
-            
-            conn.commit()
-            
+
             # Clear entries
             self.student_first_name.delete(0, tk.END)
             self.student_last_name.delete(0, tk.END)
@@ -579,13 +852,10 @@ class DrivingSchoolApp:
             messagebox.showinfo("Success", "Student added successfully")
             self.view_students()
             
-            # Refresh the student dropdown in the lesson tab
-            self.populate_student_dropdown()
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
-        finally:
-            conn.close()
+            # Add the student to the dropdown in the lesson tab
+            self.student_ids.add(student_id, first_name, last_name)
+
+        self.queries.submit(insert, on_done=inserted, on_error=self.show_database_error, write=True)
 
     # Add this method to validate phone number input in real-time
     def validate_phone_input(self, P):
@@ -601,116 +871,83 @@ class DrivingSchoolApp:
         return False
 
 
-    def initialize_student_database(self):
-        try:
-            conn = sqlite3.connect('driving_school.db')
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS students (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    first_name TEXT NOT NULL,
-                    last_name TEXT NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    phone TEXT NOT NULL
-                )
-            """)
-            
-            conn.commit()
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
-        finally:
-            conn.close()
+    def view_students(self):
+        # Earlier search results may be out of date after a change
+        self.student_live_search.reset()
 
+        # Clear search entry
+        self.student_search_entry.delete(0, tk.END)
 
-    def view_students(self):
-        # Clear the tree
-        for item in self.student_tree.get_children():
-            self.student_tree.delete(item)
-        
-        try:
-            # Connect to database
-            conn = sqlite3.connect('driving_school.db')
-            cursor = conn.cursor()
-            
-            # Fetch all students
-            cursor.execute("SELECT * FROM students")
-            students = cursor.fetchall()
-            
-            # Display in tree
-            for student in students:
-                self.student_tree.insert("", "end", values=student)
-                
-            # Update count
-            self.student_count_label.config(text=f"Total Students: {len(students)}")
-            
-            # Clear search entry
-            self.student_search_entry.delete(0, tk.END)
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
-        finally:
-            conn.close()
+        # Apply what changed since the last load, and update the total count
+        self.student_pages.refresh()
 
   
     def delete_student(self):
-        selected_item = self.student_tree.selection()
+        student_ids = selected_ids(self.student_tree)
         
-        if not selected_item:
+        if not student_ids:
             messagebox.showwarning("Selection Error", "Please select a student to delete")
             return
-        
-        try:
-            conn = sqlite3.connect('driving_school.db')
-            cursor = conn.cursor()
-            
-            student_values = self.student_tree.item(selected_item)['values']
-            student_id = student_values[0]
-            
-            # Check if student has booked lessons
-            cursor.execute("SELECT COUNT(*) FROM lessons WHERE student_id = ?", (student_id,))
-            lesson_count = cursor.fetchone()[0]
-            
-            if lesson_count > 0:
-                messagebox.showerror("Deletion Error", "Cannot delete student with booked lessons")
-                return
-            
-            if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this student?"):
-                cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
-                conn.commit()
+
+        if len(student_ids) == 1:
+            prompt = "Are you sure you want to delete this student?"
+        else:
+            prompt = f"Are you sure you want to delete these {len(student_ids)} students?"
+        if not messagebox.askyesno("Confirm Delete", prompt):
+            return
+
+        def deleted(result):
+            removed, blocked = result
+            if removed:
                 self.view_students()
-                messagebox.showinfo("Success", "Student deleted successfully")
-                
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"An error occurred: {str(e)}")
-        finally:
-            conn.close()
+                self.student_ids.remove(*removed)
+                removed_ids = set(removed)
+                self.timetable_cache.invalidate_where(lambda card: card.student_id in removed_ids)
+            self.report_deletes('student', removed, blocked)
+
+        # Foreign keys refuse to delete a student who still has lessons, so
+        # there is nothing to count first
+        self.queries.submit(
+            lambda db: delete_rows(db, 'students', student_ids),
+            on_done=deleted,
+            on_error=self.show_database_error,
+            write=True
+        )
+
+    def report_deletes(self, noun, removed, blocked):
+        # noun is singular, e.g. 'student'
+        if blocked:
+            if len(blocked) == 1 and not removed:
+                message = f"Cannot delete {noun} with booked lessons"
+            else:
+                message = f"{len(blocked)} of the selected {noun}s have booked lessons and were not deleted"
+                if removed:
+                    message = f"Deleted {len(removed)} {noun}s. {message}."
+            messagebox.showerror("Deletion Error", message)
+        elif len(removed) == 1:
+            messagebox.showinfo("Success", f"{noun.capitalize()} deleted successfully")
+        elif removed:
+            messagebox.showinfo("Success", f"{len(removed)} {noun}s deleted successfully")
+        else:
+            messagebox.showerror("Error", f"The selected {noun}s are no longer in the database")
 
     def populate_student_dropdown(self):
-        """Populate the student dropdown with the latest data from the database."""
-        try:
-            # Clear existing values
-            self.student_select['values'] = []
-            
-            # Fetch all students and format their names
-            self.cursor.execute('SELECT first_name, last_name FROM students ORDER BY first_name, last_name')
-            students = self.cursor.fetchall()
-            
-            # Format names as "First Last"
-            student_names = [f"{first} {last}" for first, last in students]
-            
-            # Update dropdown values
-            self.student_select['values'] = student_names
-            
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error populating student dropdown: {str(e)}")
+        """Reload the student names behind the dropdown from the database."""
+        def show_names(students):
+            # Labels are "First Last", made unique so each maps to one student id
+            self.student_ids = students
+
+        # The index is sorted on the reader thread
+        self.queries.submit(
+            lambda db: NameIndex.load(db, 'students'),
+            on_done=show_names,
+            on_error=lambda e: messagebox.showerror("Database Error", f"Error populating student dropdown: {str(e)}"),
+            key='student_dropdown'
+        )
 # Instructor section--------
 
-    def create_instructor_tab(self):
+    def create_instructor_tab(self, instructor_tab):
         # Instructor Management Tab
-        instructor_tab = ttk.Frame(self.notebook, style='Instructor.TFrame')
-        self.notebook.add(instructor_tab, text="Instructors")
 
         # Initialize entry widgets BEFORE using them
         self.instructor_first_name = tk.Entry(None)  # Temporary placeholder
@@ -794,6 +1031,20 @@ class DrivingSchoolApp:
         # Bind the Enter key to search_instructors method
         self.search_entry.bind("<Return>", lambda event: self.search_instructors())
 
+        # Search as the user types
+        self.instructor_live_search = LiveSearch(
+            self.search_entry,
+            run_query=lambda term, limit, on_done: self.queries.submit(
+                lambda db: search(db, 'instructors', term, limit),
+                on_done=on_done,
+                on_error=self.show_database_error,
+                key='instructor_tree'
+            ),
+            show_results=self.show_instructor_results,
+            on_clear=self.view_instructors,
+            delay_ms=self.search_delay_ms
+        )
+
         search_btn = ttk.Button(
             search_frame, 
             text="Search", 
@@ -879,6 +1130,22 @@ class DrivingSchoolApp:
         )
         delete_btn.pack(side='right', padx=10, pady=2)  # Reduced padding
 
+        import_btn = ttk.Button(
+            delete_frame,
+            text="Import CSV",
+            command=lambda: self.import_file('instructors'),
+            style='Search.TButton'
+        )
+        import_btn.pack(side='left', padx=10, pady=2)
+
+        export_btn = ttk.Button(
+            delete_frame,
+            text="Export",
+            command=lambda: self.export_file('instructors'),
+            style='Search.TButton'
+        )
+        export_btn.pack(side='left', padx=(0, 10), pady=2)
+
         # Total instructor count label
         self.instructor_count_label = tk.Label(
             delete_frame,
@@ -920,6 +1187,21 @@ class DrivingSchoolApp:
         vertical_scrollbar.config(command=self.instructor_tree.yview)
         horizontal_scrollbar.config(command=self.instructor_tree.xview)
 
+        # Rows are loaded a page at a time as the tree is scrolled
+        self.instructor_pages = LazyTree(
+            self.instructor_tree, vertical_scrollbar, self.queries, key='instructor_tree',
+            fetch_page=lambda db, after_id, limit: db.execute(
+                "SELECT id, first_name, last_name, license FROM instructors WHERE id > ? ORDER BY id LIMIT ?",
+                (after_id, limit)
+            ).fetchall(),
+            count=lambda db: db.execute("SELECT COUNT(*) FROM instructors").fetchone()[0],
+            on_count=lambda total: self.instructor_count_label.config(text=f"Total Instructors: {total}"),
+            on_error=self.show_database_error
+        )
+        self.instructor_tree.bind(
+            "<Double-1>", lambda event: self.show_more_results(event, self.instructor_tree, self.instructor_live_search)
+        )
+
         # Populate initial data
         self.view_instructors()
 
@@ -939,35 +1221,29 @@ class DrivingSchoolApp:
             return
 
         # License Number Validation: Alphanumeric mix
-        license_regex = r'^(?=.*[A-Za-z])(?=.*\d)[A-Za-z\d]+$'
-        if not re.match(license_regex, license):
+        if not re.match(LICENSE_PATTERN, license):
             messagebox.showerror("Input Error", "License Number must contain both letters and numbers.")
             return
 
-        # Check for duplicate license number (case-insensitive)
-        try:
-            # Convert to uppercase for case-insensitive comparison
-            # Using UPPER() function in SQLite for case-insensitive comparison
-            self.cursor.execute('''
-                SELECT COUNT(*) FROM instructors 
-                WHERE UPPER(license) = UPPER(?)
-            ''', (license,))
-            
-            if self.cursor.fetchone()[0] > 0:
+        def insert(db):
+            # Returns the new instructor's id, or None if the license is already registered
+            with db.transaction() as cursor:
+                # The case-insensitive unique index on license turns a duplicate
+                # into a no-op; the license is stored in its original case
+                cursor.execute('''
+                    INSERT INTO instructors 
+                    (first_name, last_name, license) 
+                    VALUES (?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                ''', (first_name, last_name, license))
+                return cursor.lastrowid if cursor.rowcount > 0 else None
+
+        def inserted(instructor_id):
+            if instructor_id is None:
                 messagebox.showerror("Error", 
                     "This License Number is already registered.")
                 return
 
-            # If no duplicate found, proceed with insertion
-            # Store the license number in its original case
-            self.cursor.execute('''
-                INSERT INTO instructors 
-                (first_name, last_name, license) 
-                VALUES (?, ?, ?)
-            ''', (first_name, last_name, license))
-            
-            self.conn.commit()
-            
             # Clear input fields after successful addition
             self.instructor_first_name.delete(0, tk.END)
             self.instructor_last_name.delete(0, tk.END)
@@ -976,85 +1252,72 @@ class DrivingSchoolApp:
             messagebox.showinfo("Success", "Instructor Added Successfully")
             
             # Refresh views
-            self.populate_instructor_dropdown()
+            self.instructor_ids.add(instructor_id, first_name, last_name)
             self.view_instructors()
-            
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Error", "Database error occurred while adding instructor.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An unexpected error occurred: {str(e)}")
+
+        def failed(error):
+            if isinstance(error, sqlite3.IntegrityError):
+                messagebox.showerror("Error", "Database error occurred while adding instructor.")
+            else:
+                messagebox.showerror("Error", f"An unexpected error occurred: {str(error)}")
+
+        self.queries.submit(insert, on_done=inserted, on_error=failed, write=True)
 
     def delete_instructor(self):
-        selected_item = self.instructor_tree.selection()
-        if not selected_item:
+        instructor_ids = selected_ids(self.instructor_tree)
+        if not instructor_ids:
             messagebox.showerror("Error", "No instructor selected.")
             return
-        
-        # Retrieve the ID from the selected row
-        values = self.instructor_tree.item(selected_item, "values")
-        if not values:
-            messagebox.showerror("Error", "Please select a valid row.")
+
+        if len(instructor_ids) == 1:
+            prompt = f"Are you sure you want to delete instructor ID {instructor_ids[0]}?"
+        else:
+            prompt = f"Are you sure you want to delete these {len(instructor_ids)} instructors?"
+        if not messagebox.askyesno("Confirm", prompt):
             return
-        
-        instructor_id = values[0]  # Assuming the first column is the ID
-        confirm = messagebox.askyesno("Confirm", f"Are you sure you want to delete instructor ID {instructor_id}?")
-        if confirm:
-            try:
-                # First, check if the instructor has any existing lessons
-                self.cursor.execute("SELECT COUNT(*) FROM lessons WHERE instructor_id = ?", (instructor_id,))
-                lesson_count = self.cursor.fetchone()[0]
-                
-                if lesson_count > 0:
-                    messagebox.showerror("Error", "Cannot delete instructor with existing lessons.")
-                    return
-                
-                # Delete from the database
-                delete_query = "DELETE FROM instructors WHERE id=?"
-                self.cursor.execute(delete_query, (instructor_id,))
-                self.conn.commit()  # Commit the change to the database
-                
-                # Refresh the TreeView
+
+        def deleted(result):
+            removed, blocked = result
+            if removed:
+                # Refresh the TreeView and the booking dropdown
                 self.view_instructors()
-                messagebox.showinfo("Success", "Instructor deleted successfully.")
-            except Exception as e:
-                messagebox.showerror("Error", f"An error occurred: {e}")
+                self.instructor_ids.remove(*removed)
+                removed_ids = set(removed)
+                self.timetable_cache.invalidate_where(lambda card: card.instructor_id in removed_ids)
+            self.report_deletes('instructor', removed, blocked)
+
+        # Foreign keys refuse to delete an instructor who still has lessons
+        self.queries.submit(
+            lambda db: delete_rows(db, 'instructors', instructor_ids),
+            on_done=deleted,
+            on_error=lambda e: messagebox.showerror("Error", f"An error occurred: {e}"),
+            write=True
+        )
 
     def view_instructors(self):
-        # Clear the TreeView
-        for row in self.instructor_tree.get_children():
-            self.instructor_tree.delete(row)
+        # Earlier search results may be out of date after a change
+        self.instructor_live_search.reset()
 
-        # Fetch data from the database
-        select_query = 'SELECT id, first_name, last_name, license FROM instructors'
-        self.cursor.execute(select_query)
-        rows = self.cursor.fetchall()
+        # Apply what changed since the last load, and update the total count
+        self.instructor_pages.refresh()
 
-        # Populate the TreeView
-        for row in rows:
-            self.instructor_tree.insert("", "end", values=row)
-
-        # Update the total count label
-        total_instructors = len(rows)
-        self.instructor_count_label.config(text=f"Total Instructors: {total_instructors}")
+    def show_more_results(self, event, tree, live_search):
+        # Only the "More results..." row at the end of a search responds
+        item = tree.identify_row(event.y)
+        if item and "more" in tree.item(item, 'tags'):
+            live_search.more()
 
     def search_instructors(self):
+        # Ranked full-text search over names, contact details and license,
+        # run now rather than after the typing delay
+        self.instructor_live_search.run(force=True)
+
+    def show_instructor_results(self, results, complete=True):
+        # Search results replace the paged list until the next reset
+        self.instructor_pages.stop()
+
         # Clear the TreeView
-        for item in self.instructor_tree.get_children():
-            self.instructor_tree.delete(item)
-
-        # Get the search query
-        search_query = self.search_entry.get().strip()
-
-        # Perform a case-insensitive search in the database
-        query = """
-            SELECT id, first_name, last_name, license
-            FROM instructors 
-            WHERE UPPER(first_name) LIKE UPPER(?) OR 
-                UPPER(last_name) LIKE UPPER(?) OR 
-                UPPER(license) LIKE UPPER(?)
-        """
-        self.cursor.execute(query, (f"%{search_query}%", f"%{search_query}%", f"%{search_query}%"))
-        results = self.cursor.fetchall()
+        self.instructor_tree.delete(*self.instructor_tree.get_children())
 
         if results:
             # Populate TreeView with results
@@ -1063,21 +1326,30 @@ class DrivingSchoolApp:
         else:
             # Add a dummy row for "No results found"
             self.instructor_tree.insert("", "end", values=("", "No results found", "", ""), tags=("placeholder",))
+        if not complete:
+            # Searches stop at a page of matches; double-clicking this row fetches the next
+            self.instructor_tree.insert("", "end", values=("", "More results...", "", ""), tags=("more",))
 
         # Style for the placeholder row
         self.instructor_tree.tag_configure("placeholder", foreground="red", font=("Arial", 12, "italic"))
+        self.instructor_tree.tag_configure("more", foreground="blue", font=("Arial", 10, "italic"))
 
     def populate_instructor_dropdown(self):
     # Populate instructor dropdown
-        self.cursor.execute('SELECT id, CONCAT(first_name, " ", last_name) as full_name FROM instructors')
-        instructors = self.cursor.fetchall()
-        self.instructor_select['values'] = [f"{i[1]}" for i in instructors]  # Display only full names for selection
+        def show_names(instructors):
+            # Labels are "First Last", made unique so each maps to one instructor id
+            self.instructor_ids = instructors
+
+        self.queries.submit(
+            lambda db: NameIndex.load(db, 'instructors'),
+            on_done=show_names,
+            on_error=self.show_database_error,
+            key='instructor_dropdown'
+        )
 
 
 # lesson  section------------
-    def create_lesson_tab(self):
-        lesson_tab = ttk.Frame(self.notebook, style='Lesson.TFrame')
-        self.notebook.add(lesson_tab, text="Lessons")
+    def create_lesson_tab(self, lesson_tab):
 
         style = ttk.Style()
         colors = {
@@ -1106,13 +1378,16 @@ class DrivingSchoolApp:
         # Initialize widgets
         self.student_select = ttk.Combobox(input_frame, font=('Segoe UI', 12), width=25)
         self.instructor_select = ttk.Combobox(input_frame, font=('Segoe UI', 12), width=25)
-        self.lesson_type = ttk.Combobox(input_frame, font=('Segoe UI', 12), width=25, values=['Introductory', 'Standard', 'Pass Plus', 'Driving Test'])
+        self.lesson_type = ttk.Combobox(input_frame, font=('Segoe UI', 12), width=25, values=self.rates.types)
         self.pay_rate_label = tk.Label(input_frame, text="0", font=('Segoe UI', 12), bg=colors['input_bg'], fg=colors['text_dark'])
         self.lesson_date = DateEntry(input_frame, font=('Segoe UI', 12), width=25, date_pattern='yyyy-mm-dd')
+        self.lesson_start = ttk.Combobox(input_frame, font=('Segoe UI', 12), width=25, values=START_TIMES, state='readonly')
         self.lesson_duration = tk.Entry(input_frame, font=('Segoe UI', 12), width=25)
         self.total_fee_label = tk.Label(input_frame, text="0", font=('Segoe UI', 12), bg=colors['input_bg'], fg=colors['text_dark'])
 
         self.lesson_type.bind("<<ComboboxSelected>>", self.update_pay_rate)
+        # Rates can change from one date to the next
+        self.lesson_date.bind("<<DateEntrySelected>>", self.update_pay_rate)
         self.lesson_duration.bind("<KeyRelease>", self.calculate_total_fee)
 
         input_fields = [
@@ -1121,6 +1396,7 @@ class DrivingSchoolApp:
             ("Lesson Type:", self.lesson_type),
             ("Pay Rate (£/hr):", self.pay_rate_label),
             ("Lesson Date:", self.lesson_date),
+            ("Start Time:", self.lesson_start),
             ("Duration (hours):", self.lesson_duration),
             ("Total Fee (£):", self.total_fee_label)
         ]
@@ -1141,6 +1417,21 @@ class DrivingSchoolApp:
         book_btn = ttk.Button(button_frame, text="Book Lesson", command=self.book_lesson, style='Add.TButton')
         book_btn.pack(side='left', padx=5)
 
+        series_btn = ttk.Button(button_frame, text="Book Series", command=self.book_series_dialog, style='Add.TButton')
+        series_btn.pack(side='left', padx=5)
+
+        suggest_btn = ttk.Button(button_frame, text="Suggest Slots", command=self.suggest_lesson_slots, style='Search.TButton')
+        suggest_btn.pack(side='left', padx=5)
+
+        import_btn = ttk.Button(button_frame, text="Import CSV", command=lambda: self.import_file('lessons'), style='Search.TButton')
+        import_btn.pack(side='left', padx=5)
+
+        export_btn = ttk.Button(button_frame, text="Export", command=self.export_lessons_dialog, style='Search.TButton')
+        export_btn.pack(side='left', padx=5)
+
+        rates_btn = ttk.Button(button_frame, text="Rates", command=self.edit_rates_dialog, style='Search.TButton')
+        rates_btn.pack(side='left', padx=5)
+
         # Right-aligned delete button
         delete_btn = ttk.Button(button_frame, text="Delete Lesson", command=self.delete_lesson, style='Reset.TButton')
         delete_btn.pack(side='right', padx=5)
@@ -1155,7 +1446,7 @@ class DrivingSchoolApp:
         # TreeView Configuration
         self.lesson_tree = ttk.Treeview(
             tree_frame,
-            columns=('Student', 'Instructor', 'Type', 'Date', 'Duration', 'Fee', 'Status'),
+            columns=('Student', 'Instructor', 'Type', 'Date', 'Time', 'Duration', 'Fee', 'Status'),
             show="headings",
             yscrollcommand=vertical_scrollbar.set
         )
@@ -1166,6 +1457,7 @@ class DrivingSchoolApp:
             'Instructor': {'width': 120, 'anchor': 'center'},
             'Type': {'width': 100, 'anchor': 'center'},
             'Date': {'width': 100, 'anchor': 'center'},
+            'Time': {'width': 100, 'anchor': 'center'},
             'Duration': {'width': 70, 'anchor': 'center'},
             'Fee': {'width': 70, 'anchor': 'center'},
             'Status': {'width': 80, 'anchor': 'center'}
@@ -1177,9 +1469,20 @@ class DrivingSchoolApp:
 
         vertical_scrollbar.config(command=self.lesson_tree.yview)
 
+        # Rows are loaded a page at a time as the tree is scrolled; the lesson
+        # id is kept as the item id rather than shown
+        self.lesson_pages = LazyTree(
+            self.lesson_tree, vertical_scrollbar, self.queries, key='lesson_tree',
+            fetch_page=self.fetch_lesson_page,
+            on_error=self.show_database_error,
+            show_id=False
+        )
+
+        # The dropdowns list only the names starting with what has been typed
+        TypeAhead(self.student_select, lambda: self.student_ids)
+        TypeAhead(self.instructor_select, lambda: self.instructor_ids)
+
         # Initial data load
-        self.populate_student_dropdown()
-        self.populate_instructor_dropdown()
         self.view_lessons()
 
     # Add these methods to the DrivingSchoolApp class
@@ -1190,82 +1493,34 @@ class DrivingSchoolApp:
             messagebox.showerror("Error", "Please select a lesson to delete")
             return
 
-        if not messagebox.askyesno("Confirm", "Are you sure you want to delete this lesson?"):
+        if len(selected_item) == 1:
+            prompt = "Are you sure you want to delete this lesson?"
+        else:
+            prompt = f"Are you sure you want to delete these {len(selected_item)} lessons?"
+        if not messagebox.askyesno("Confirm", prompt):
             return
 
-        try:
-            # Get the values from the selected row
-            row_values = self.lesson_tree.item(selected_item)['values']
-            
-            # Get student and instructor IDs from names
-            student_name = row_values[0]
-            instructor_name = row_values[1]
-            lesson_date = row_values[3]
-            
-            # Find the lesson ID using the information from the selected row
-            self.cursor.execute("""
-                SELECT l.id FROM lessons l
-                JOIN students s ON l.student_id = s.id
-                JOIN instructors i ON l.instructor_id = i.id
-                WHERE s.first_name || ' ' || s.last_name = ?
-                AND i.first_name || ' ' || i.last_name = ?
-                AND l.lesson_date = ?
-            """, (student_name, instructor_name, lesson_date))
-            
-            lesson_id = self.cursor.fetchone()
-            
-            if lesson_id:
-                # Delete the lesson
-                self.cursor.execute("DELETE FROM lessons WHERE id = ?", (lesson_id[0],))
-                self.conn.commit()
-                messagebox.showinfo("Success", "Lesson deleted successfully")
+        # The tree keeps each lesson's id as its item id
+        lesson_dates = {int(item): self.lesson_tree.set(item, 'Date') for item in selected_item}
+
+        def deleted(result):
+            removed, _ = result
+            if removed:
+                if len(removed) == 1:
+                    messagebox.showinfo("Success", "Lesson deleted successfully")
+                else:
+                    messagebox.showinfo("Success", f"{len(removed)} lessons deleted successfully")
                 self.view_lessons()  # Refresh the view
+                self.lessons_changed(*{lesson_dates[lesson_id] for lesson_id in removed})
             else:
                 messagebox.showerror("Error", "Lesson not found in database")
-                
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Error deleting lesson: {str(e)}")
 
-        # TreeView Section with improved styling
-        tree_frame = tk.Frame(main_frame, bg='white', bd=1, relief='solid')
-        tree_frame.pack(pady=10, fill="both", expand=True)
-
-        # Scrollbars
-        vertical_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical")
-        vertical_scrollbar.pack(side="right", fill="y")
-
-        # TreeView Configuration
-        self.lesson_tree = ttk.Treeview(
-            tree_frame,
-            columns=('Student', 'Instructor', 'Type', 'Date', 'Duration', 'Fee', 'Status'),
-            show="headings",
-            yscrollcommand=vertical_scrollbar.set
+        self.queries.submit(
+            lambda db: delete_rows(db, 'lessons', list(lesson_dates)),
+            on_done=deleted,
+            on_error=lambda e: messagebox.showerror("Database Error", f"Error deleting lesson: {str(e)}"),
+            write=True
         )
-        self.lesson_tree.pack(fill="both", expand=True)
-
-        # Configure columns
-        column_configs = {
-            'Student': {'width': 120, 'anchor': 'center'},
-            'Instructor': {'width': 120, 'anchor': 'center'},
-            'Type': {'width': 100, 'anchor': 'center'},
-            'Date': {'width': 100, 'anchor': 'center'},
-            'Duration': {'width': 70, 'anchor': 'center'},
-            'Fee': {'width': 70, 'anchor': 'center'},
-            'Status': {'width': 80, 'anchor': 'center'}
-        }
-
-        for col, config in column_configs.items():
-            self.lesson_tree.heading(col, text=col)
-            self.lesson_tree.column(col, **config)
-
-        # Configure scrollbar
-        vertical_scrollbar.config(command=self.lesson_tree.yview)
-
-        # Initial data load
-        self.populate_student_dropdown()
-        self.populate_instructor_dropdown()
- 
-        self.view_lessons()
 
 
     def reset_lesson_form(self):
@@ -1275,10 +1530,175 @@ class DrivingSchoolApp:
         self.lesson_type.set("")
         self.pay_rate_label.config(text="0")
         self.lesson_date.set_date(date.today())  # Reset to today's date
+        self.lesson_start.set("")
         self.lesson_duration.delete(0, tk.END)
         self.total_fee_label.config(text="0")
 
 
+    def import_file(self, table):
+        path = filedialog.askopenfilename(
+            title=f"Import {table.capitalize()}",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+
+        def imported(result):
+            message = f"Imported {result.imported} {table} ({result.rows_per_second:.0f} rows/sec)."
+            if result.rejected:
+                message += f"\n\n{result.rejected} rows were rejected; see {result.reject_path}"
+            log.info("Imported %s from %s: %s", table, path, result)
+            messagebox.showinfo("Import Complete", message)
+
+            # Refresh whatever shows the imported rows
+            if table == 'students':
+                self.view_students()
+                self.populate_student_dropdown()
+            elif table == 'instructors':
+                self.view_instructors()
+                self.populate_instructor_dropdown()
+            else:
+                self.view_lessons()
+                self.lessons_changed()
+
+        # Runs on the writer thread, so the window stays responsive
+        self.queries.submit(
+            lambda db: import_csv(db, table, path),
+            on_done=imported,
+            on_error=lambda e: messagebox.showerror("Import Error", f"Could not import {path}: {e}"),
+            write=True
+        )
+
+    def ask_export_path(self, title, default_name):
+        return filedialog.asksaveasfilename(
+            title=title,
+            initialfile=default_name,
+            defaultextension='.csv',
+            filetypes=[("CSV files", "*.csv"), ("Columnar files", f"*{COLUMNAR_EXTENSION}")]
+        )
+
+    def export_file(self, table):
+        path = self.ask_export_path(f"Export {table.capitalize()}", f"{table}.csv")
+        if not path:
+            return
+        self.run_export(lambda db: export_roster(db, table, path), table, path)
+
+    def export_lessons_dialog(self):
+        # Optional date range; both ends are inclusive
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Export Lessons")
+        dialog.transient(self.root)
+
+        all_dates = tk.BooleanVar(value=True)
+        first_day = DateEntry(dialog, font=('Segoe UI', 12), width=12, date_pattern='yyyy-mm-dd')
+        last_day = DateEntry(dialog, font=('Segoe UI', 12), width=12, date_pattern='yyyy-mm-dd')
+
+        def toggle_range():
+            state = 'disabled' if all_dates.get() else 'normal'
+            first_day.config(state=state)
+            last_day.config(state=state)
+
+        ttk.Checkbutton(dialog, text="All dates", variable=all_dates, command=toggle_range).grid(
+            row=0, column=0, columnspan=2, padx=10, pady=(10, 5), sticky='w')
+        ttk.Label(dialog, text="From:").grid(row=1, column=0, padx=10, pady=3, sticky='e')
+        first_day.grid(row=1, column=1, padx=10, pady=3, sticky='w')
+        ttk.Label(dialog, text="To:").grid(row=2, column=0, padx=10, pady=3, sticky='e')
+        last_day.grid(row=2, column=1, padx=10, pady=3, sticky='w')
+        toggle_range()
+
+        def export():
+            if all_dates.get():
+                start = end = None
+            else:
+                start, end = first_day.get_date(), last_day.get_date()
+                if end < start:
+                    self.show_error("The end date is before the start date")
+                    return
+            path = self.ask_export_path("Export Lessons", "lessons.csv")
+            if not path:
+                return
+            dialog.destroy()
+            self.run_export(lambda db: export_lessons(db, path, start, end), 'lessons', path)
+
+        ttk.Button(dialog, text="Export", command=export, style='Add.TButton').grid(
+            row=3, column=1, padx=10, pady=10, sticky='e')
+
+    def edit_rates_dialog(self):
+        # A new hourly rate for one lesson type, from a given date
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Lesson Rates")
+        dialog.transient(self.root)
+
+        lesson_type = ttk.Combobox(dialog, font=('Segoe UI', 12), width=15, values=self.rates.types)
+        hourly_rate = tk.Entry(dialog, font=('Segoe UI', 12), width=15)
+        effective_from = DateEntry(dialog, font=('Segoe UI', 12), width=13, date_pattern='yyyy-mm-dd')
+        reprice = tk.BooleanVar(value=True)
+
+        def show_current(event=None):
+            rate = self.rates.rate(lesson_type.get(), effective_from.get_date())
+            hourly_rate.delete(0, tk.END)
+            if rate is not None:
+                hourly_rate.insert(0, f"{rate:g}")
+
+        lesson_type.bind("<<ComboboxSelected>>", show_current)
+        effective_from.bind("<<DateEntrySelected>>", show_current)
+
+        fields = [
+            ("Lesson Type:", lesson_type),
+            ("Rate (£/hr):", hourly_rate),
+            ("Effective From:", effective_from),
+        ]
+        for row, (label_text, widget) in enumerate(fields):
+            ttk.Label(dialog, text=label_text).grid(row=row, column=0, padx=10, pady=3, sticky='e')
+            widget.grid(row=row, column=1, padx=10, pady=3, sticky='w')
+        ttk.Checkbutton(dialog, text="Reprice lessons already booked from this date", variable=reprice).grid(
+            row=len(fields), column=0, columnspan=2, padx=10, pady=5, sticky='w')
+
+        def save():
+            name = lesson_type.get().strip()
+            if not name:
+                self.show_error("Please enter a lesson type")
+                return
+            try:
+                rate = float(hourly_rate.get())
+            except ValueError:
+                self.show_error("Please enter a valid rate")
+                return
+            if rate <= 0:
+                self.show_error("The rate must be more than zero")
+                return
+            day = effective_from.get_date()
+            repricing = reprice.get()
+            dialog.destroy()
+
+            def saved(repriced):
+                message = f"{name} lessons cost £{rate:g} per hour from {day.isoformat()}."
+                if repriced:
+                    message += f"\n\n{repriced} booked lessons were repriced."
+                messagebox.showinfo("Rates Updated", message)
+                self.load_rates()
+                if repriced:
+                    self.view_lessons()
+                    self.lessons_changed()
+
+            self.queries.submit(
+                lambda db: set_rate(db, name, rate, day, repricing),
+                on_done=saved,
+                on_error=self.show_database_error,
+                write=True
+            )
+
+        ttk.Button(dialog, text="Save", command=save, style='Add.TButton').grid(
+            row=len(fields) + 1, column=1, padx=10, pady=10, sticky='e')
+
+    def run_export(self, work, what, path):
+        # Exports only read, so they run on a reader thread
+        self.queries.submit(
+            work,
+            on_done=lambda count: messagebox.showinfo("Export Complete", f"Exported {count} {what} to {path}"),
+            on_error=lambda e: messagebox.showerror("Export Error", f"Could not export {what}: {e}")
+        )
+
     def show_error(self, message):
         messagebox.showerror("Error", message)
 
@@ -1287,110 +1707,641 @@ class DrivingSchoolApp:
         duration = self.lesson_duration.get()
 
         if lesson_type and duration.isdigit():
-            pay_rate = self.pay_rate_map.get(lesson_type, 0)
-            total_fee = pay_rate * int(duration)
-            self.total_fee_label.config(text=f"£{total_fee}")
+            # An in-memory lookup, so it is cheap enough to run on every key
+            total_fee = self.rates.fee(lesson_type, self.lesson_date.get_date(), int(duration)) or 0
+            self.total_fee_label.config(text=f"£{total_fee:g}")
             return total_fee  # Return the calculated total fee
         else:
             self.total_fee_label.config(text="0")
             return 0
 
-    def book_lesson(self):
+    def read_lesson_form(self):
+        """The checked form values as a LessonForm, or None after showing what is wrong."""
         # Get values from the form
         student_name = self.student_select.get()
         instructor_name = self.instructor_select.get()
         lesson_type = self.lesson_type.get()
         lesson_date = self.lesson_date.get_date()
+        start_time = self.lesson_start.get()
         
+        if not start_time:
+            self.show_error("Please select a start time")
+            return None
+
         try:
             duration = int(self.lesson_duration.get())
         except ValueError:
             self.show_error("Please enter a valid duration")
-            return
+            return None
             
-        # Validate duration (must not exceed 10 hours)
-        if duration > 10:
-            self.show_error("Duration cannot exceed 10 hours")
-            return
+        # Validate duration (at least an hour, and no more than 10)
+        if not 1 <= duration <= MAX_LESSON_HOURS:
+            self.show_error(f"Duration must be between 1 and {MAX_LESSON_HOURS} hours")
+            return None
 
-        status = 'Booked'
-        
-        # Calculate total fee
-        total_fee = self.calculate_total_fee()  # Get the actual total fee
-        
-        if total_fee == 0:
+        if not self.rates.fee(lesson_type, lesson_date, duration):
             self.show_error("Invalid fee calculation")
-            return
+            return None
 
         # Validate the lesson date
         today = date.today()
         if lesson_date < today:
             self.show_error("Cannot book a lesson for a past date")
+            return None
+
+        # Look up the IDs behind the selected dropdown labels
+        student_id = self.student_ids.get(student_name)
+        if student_id is None:
+            self.show_error(f"Student '{student_name}' not found.")
+            return None
+
+        instructor_id = self.instructor_ids.get(instructor_name)
+        if instructor_id is None:
+            self.show_error(f"Instructor '{instructor_name}' not found.")
+            return None
+
+        return LessonForm(student_id, instructor_id, lesson_type, lesson_date, start_time, duration)
+
+    def book_lesson(self):
+        form = self.read_lesson_form()
+        if form is None:
             return
 
-        # Fetch IDs for student and instructor based on names
-        self.cursor.execute("SELECT id FROM students WHERE first_name || ' ' || last_name = ?", (student_name,))
-        student_record = self.cursor.fetchone()
+        status = 'Booked'
         
-        if student_record is None:
+        # The fee is fixed at the rate in effect on the lesson date
+        total_fee = self.rates.fee(form.lesson_type, form.lesson_date, form.duration)
+        start, end = lesson_interval(form.lesson_date, form.start_time, form.duration)
+
+        def booked(clash):
+            # book_lesson names whoever already has a lesson at that time
+            if clash:
+                self.show_error(f"The {clash} already has a lesson between {start} and {end[11:]}.")
+                return
+            self.reset_lesson_form()
+            messagebox.showinfo("Success", "Lesson Booked")
+            self.view_lessons()
+            self.lessons_changed(start[:10])
+
+        # Checked for clashes and inserted with the total fee in one transaction
+        self.queries.submit(
+            lambda db: book_lesson(
+                db, form.student_id, form.instructor_id, form.lesson_type, start, end, form.duration, status, total_fee
+            ),
+            on_done=booked,
+            on_error=self.show_database_error,
+            write=True
+        )
+
+    def book_series_dialog(self):
+        # The lesson in the form, repeated every few days or weeks
+        form = self.read_lesson_form()
+        if form is None:
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Book Series")
+        dialog.transient(self.root)
+
+        every = tk.Spinbox(dialog, font=('Segoe UI', 12), from_=1, to=52, width=5)
+        unit = ttk.Combobox(dialog, font=('Segoe UI', 12), width=8, values=['weeks', 'days'], state='readonly')
+        unit.set('weeks')
+        ends = tk.StringVar(value='count')
+        count = tk.Spinbox(dialog, font=('Segoe UI', 12), from_=1, to=MAX_SERIES_LESSONS, width=5)
+        count.delete(0, tk.END)
+        count.insert(0, '10')
+        until = DateEntry(dialog, font=('Segoe UI', 12), width=12, date_pattern='yyyy-mm-dd')
+
+        ttk.Label(dialog, text=f"Starting {form.lesson_date.isoformat()} at {form.start_time}").grid(
+            row=0, column=0, columnspan=3, padx=10, pady=(10, 5), sticky='w')
+        ttk.Label(dialog, text="Repeat every:").grid(row=1, column=0, padx=10, pady=3, sticky='e')
+        every.grid(row=1, column=1, padx=(10, 3), pady=3, sticky='w')
+        unit.grid(row=1, column=2, padx=(0, 10), pady=3, sticky='w')
+        ttk.Radiobutton(dialog, text="Number of lessons:", variable=ends, value='count').grid(
+            row=2, column=0, padx=10, pady=3, sticky='w')
+        count.grid(row=2, column=1, padx=10, pady=3, sticky='w')
+        ttk.Radiobutton(dialog, text="Until:", variable=ends, value='until').grid(
+            row=3, column=0, padx=10, pady=3, sticky='w')
+        until.grid(row=3, column=1, columnspan=2, padx=10, pady=3, sticky='w')
+
+        def book():
+            try:
+                step = int(every.get())
+                lesson_count = int(count.get()) if ends.get() == 'count' else None
+            except ValueError:
+                self.show_error("Please enter whole numbers for the repeat and the number of lessons")
+                return
+            if step < 1 or (lesson_count is not None and lesson_count < 1):
+                self.show_error("The repeat and the number of lessons must be at least 1")
+                return
+            last_day = until.get_date() if ends.get() == 'until' else None
+
+            days = series_days(form.lesson_date, step * 7 if unit.get() == 'weeks' else step, lesson_count, last_day)
+            if not days:
+                self.show_error("The series ends before its first lesson")
+                return
+
+            # Each lesson is priced at the rate in effect on its own date
+            lessons = [
+                lesson_interval(day, form.start_time, form.duration)
+                + (form.duration, self.rates.fee(form.lesson_type, day, form.duration))
+                for day in days
+            ]
+
+            def booked(clashes):
+                if clashes:
+                    lines = [f"{start} - {end[11:]}: the {who} already has a lesson" for start, end, who in clashes[:10]]
+                    if len(clashes) > len(lines):
+                        lines.append(f"...and {len(clashes) - len(lines)} more")
+                    self.show_error(
+                        f"{len(clashes)} of the {len(lessons)} lessons clash, so none were booked.\n\n" + "\n".join(lines)
+                    )
+                    return
+                dialog.destroy()
+                self.reset_lesson_form()
+                # One refresh for the whole series
+                self.view_lessons()
+                self.lessons_changed(*(day.isoformat() for day in days))
+                messagebox.showinfo(
+                    "Success", f"Booked {len(lessons)} lessons from {days[0].isoformat()} to {days[-1].isoformat()}"
+                )
+
+            # Checked for clashes in one pass and inserted in one transaction
+            self.queries.submit(
+                lambda db: book_series(db, form.student_id, form.instructor_id, form.lesson_type, lessons, 'Booked'),
+                on_done=booked,
+                on_error=self.show_database_error,
+                write=True
+            )
+
+        ttk.Button(dialog, text="Book Series", command=book, style='Add.TButton').grid(
+            row=4, column=2, padx=10, pady=10, sticky='e')
+
+    def suggest_lesson_slots(self):
+        # Free slots for the selected instructor, or for every instructor when
+        # none is selected, avoiding the selected student's lessons too
+        try:
+            duration = int(self.lesson_duration.get())
+        except ValueError:
+            self.show_error("Please enter a valid duration")
+            return
+
+        if not 1 <= duration <= MAX_LESSON_HOURS:
+            self.show_error(f"Duration must be between 1 and {MAX_LESSON_HOURS} hours")
+            return
+
+        instructor_name = self.instructor_select.get()
+        if instructor_name:
+            instructor_id = self.instructor_ids.get(instructor_name)
+            if instructor_id is None:
+                self.show_error(f"Instructor '{instructor_name}' not found.")
+                return
+            instructor_ids = [instructor_id]
+        else:
+            instructor_ids = list(self.instructor_ids.values())
+
+        student_name = self.student_select.get()
+        student_id = self.student_ids.get(student_name) if student_name else None
+        if student_name and student_id is None:
             self.show_error(f"Student '{student_name}' not found.")
             return
-        student_id = student_record[0]
 
-        self.cursor.execute("SELECT id FROM instructors WHERE first_name || ' ' || last_name = ?", (instructor_name,))
-        instructor_record = self.cursor.fetchone()
-        
-        if instructor_record is None:
-            self.show_error(f"Instructor '{instructor_name}' not found.")
+        first_day = max(self.lesson_date.get_date(), date.today())
+
+        self.queries.submit(
+            lambda db: suggest_slots(db, instructor_ids, duration, first_day, student_id=student_id),
+            on_done=self.show_slot_suggestions,
+            on_error=self.show_database_error,
+            key='slot_suggestions'
+        )
+
+    def show_slot_suggestions(self, suggestions):
+        # Skip instructors deleted while the search was running
+        slots = sorted(
+            (start, end, self.instructor_ids.label(instructor_id))
+            for instructor_id, free in suggestions.items()
+            if instructor_id in self.instructor_ids.names
+            for start, end in free
+        )
+        if not slots:
+            messagebox.showinfo("Suggest Slots", "No free slots in the next 90 days")
             return
-        instructor_id = instructor_record[0]
-
-        # Insert into the lessons table with the total fee
-        self.cursor.execute('''
-            INSERT INTO lessons (student_id, instructor_id, lesson_type, lesson_date, duration, status, fee)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (student_id, instructor_id, lesson_type, lesson_date, duration, status, total_fee))  # Use total_fee here
-
-        # Commit the changes
-        self.conn.commit()
-        self.reset_lesson_form()
-        messagebox.showinfo("Success", "Lesson Booked")
-        self.view_lessons()
 
-    def update_pay_rate(self, event):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Suggested Slots")
+        dialog.transient(self.root)
+
+        listbox = tk.Listbox(dialog, font=('Segoe UI', 11), width=50, height=min(len(slots), 15))
+        listbox.pack(side='left', fill='both', expand=True, padx=10, pady=10)
+        scrollbar = ttk.Scrollbar(dialog, orient='vertical', command=listbox.yview)
+        scrollbar.pack(side='right', fill='y')
+        listbox.config(yscrollcommand=scrollbar.set)
+
+        for start, end, instructor_name in slots:
+            listbox.insert(tk.END, f"{start} - {end[11:]}  {instructor_name}")
+
+        def use_slot(event=None):
+            # Copy the chosen slot into the booking form
+            selection = listbox.curselection()
+            if not selection:
+                return
+            start, end, instructor_name = slots[selection[0]]
+            self.lesson_date.set_date(date.fromisoformat(start[:10]))
+            self.lesson_start.set(start[11:])
+            self.instructor_select.set(instructor_name)
+            dialog.destroy()
+
+        listbox.bind("<Double-Button-1>", use_slot)
+        listbox.bind("<Return>", use_slot)
+
+    def update_pay_rate(self, event=None):
         lesson_type = self.lesson_type.get()
-        pay_rate = self.pay_rate_map.get(lesson_type, 0)  # Fetch pay rate for the lesson type
-        self.pay_rate_label.config(text=f"£{pay_rate}")  # Update pay rate display
+        pay_rate = self.rates.rate(lesson_type, self.lesson_date.get_date()) or 0  # Rate on the lesson date
+        self.pay_rate_label.config(text=f"£{pay_rate:g}")  # Update pay rate display
         self.calculate_total_fee()  # Recalculate fee in case duration is already entered
 
 
     def view_lessons(self):
-        # Clear existing items
-        for i in self.lesson_tree.get_children():
-            self.lesson_tree.delete(i)
-        
+        # Apply what changed since the last load
+        self.lesson_pages.refresh()
+
+    def fetch_lesson_page(self, db, after_id, limit):
         # Fetch lessons with student and instructor names
-        self.cursor.execute('''
-            SELECT s.first_name || ' ' || s.last_name as student_name,
+        rows = db.execute('''
+            SELECT l.id,
+                s.first_name || ' ' || s.last_name as student_name,
                 i.first_name || ' ' || i.last_name as instructor_name,
                 l.lesson_type, 
                 l.lesson_date, 
+                substr(l.start_time, 12, 5) || ' - ' || substr(l.end_time, 12, 5),
                 l.duration,
                 l.fee,
                 l.status
             FROM lessons l
             JOIN students s ON l.student_id = s.id
             JOIN instructors i ON l.instructor_id = i.id
-        ''')
-        rows = self.cursor.fetchall()
+            WHERE l.id > ?
+            ORDER BY l.id
+            LIMIT ?
+        ''', (after_id, limit)).fetchall()
         
-        # Debug print
-        print("Fetched rows:", rows)
-        
-        # Insert the fetched rows into the treeview
+        log.debug("Fetched %d lesson rows after id %d", len(rows), after_id)
+        return rows
+
+
+class LessonForm(NamedTuple):
+    """The lesson form's values once read_lesson_form has checked them."""
+    student_id: int
+    instructor_id: int
+    lesson_type: str
+    lesson_date: date
+    start_time: str
+    duration: int
+
+
+def selected_ids(tree):
+    """Ids of the selected rows of a tree that shows the id in its first column."""
+    ids = []
+    for item in tree.selection():
+        values = tree.item(item, 'values')
+        # Skips placeholder rows such as "No results found"
+        if values and str(values[0]).isdigit():
+            ids.append(int(values[0]))
+    return ids
+
+
+class LiveSearch:
+    """Search-as-you-type for an entry box.
+
+    Queries run once typing has paused for delay_ms, an unchanged term is not
+    searched again, and a term that extends the previous one is answered by
+    filtering the previous results instead of querying, as long as those
+    results were not cut short.
+    run_query(term, limit, on_done) must eventually call on_done(rows) with
+    at most limit rows. show_results(rows, complete) is told whether rows
+    are every match; more() searches again for another page_size rows. A
+    blank term is never searched: on_clear() is called instead, to go back
+    to the paged list, which must call reset().
+    """
+    def __init__(self, entry, run_query, show_results, on_clear, delay_ms=300, page_size=SEARCH_LIMIT):
+        self.entry = entry
+        self.run_query = run_query
+        self.show_results = show_results
+        self.on_clear = on_clear
+        self.delay_ms = delay_ms
+        self.page_size = page_size
+        self.after_id = None
+        # The term most recently asked for, whose answer is still wanted
+        self.wanted = ''
+        # The term whose results the tree shows; the tree starts out showing
+        # the paged list, which is what a blank term means
+        self.last_term = ''
+        self.last_rows = None
+        self.limit = page_size
+        self.complete = False
+
+        self.entry.bind("<KeyRelease>", self.schedule, add='+')
+
+    def schedule(self, event=None):
+        if self.after_id is not None:
+            self.entry.after_cancel(self.after_id)
+        self.after_id = self.entry.after(self.delay_ms, self.run)
+
+    def run(self, force=False):
+        if self.after_id is not None:
+            self.entry.after_cancel(self.after_id)
+            self.after_id = None
+
+        term = self.entry.get().strip()
+        if term == self.wanted and not force:
+            return
+
+        if not term:
+            self.on_clear()
+            return
+
+        # Filtering a truncated result set could miss matches past its end
+        rows = None
+        if self.last_rows is not None and self.complete and not force:
+            rows = refine(self.last_rows, self.last_term, term)
+
+        if rows is not None:
+            self.wanted = term
+            self.results_ready(term, self.limit, rows)
+        else:
+            self.query(term, self.page_size)
+
+    def more(self):
+        """Search the shown term again for another page of results."""
+        if self.last_rows is None or self.complete:
+            return
+        self.query(self.last_term, self.limit + self.page_size)
+
+    def query(self, term, limit):
+        self.wanted = term
+        # One row past the limit tells whether there were more matches
+        self.run_query(term, limit + 1, lambda rows: self.results_ready(term, limit, rows))
+
+    def results_ready(self, term, limit, rows):
+        # Ignore an answer for a term the user has already typed past
+        if term != self.wanted:
+            return
+        self.last_term = term
+        self.last_rows = rows[:limit]
+        self.limit = limit
+        self.complete = len(rows) <= limit
+        self.show_results(self.last_rows, self.complete)
+
+    def reset(self):
+        """Forget the previous results, e.g. after the table has changed.
+
+        Call when the tree goes back to the paged list.
+        """
+        if self.after_id is not None:
+            self.entry.after_cancel(self.after_id)
+            self.after_id = None
+        self.wanted = ''
+        self.last_term = ''
+        self.last_rows = None
+        self.limit = self.page_size
+        self.complete = False
+
+
+class TypeAhead:
+    """Narrows a combobox's choices to the names starting with what has been typed.
+
+    get_index() returns the NameIndex to search; it is called each time, as
+    the index is replaced whenever it is reloaded.
+    """
+    def __init__(self, combobox, get_index, limit=MATCH_LIMIT):
+        self.combobox = combobox
+        self.get_index = get_index
+        self.limit = limit
+
+        # Refill just before the list opens, and as each key is typed
+        self.combobox.configure(postcommand=self.fill)
+        self.combobox.bind("<KeyRelease>", self.typed, add='+')
+
+    def typed(self, event):
+        # Keys that move through or close the list leave it alone
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        self.fill()
+
+    def fill(self):
+        self.combobox['values'] = self.get_index().matches(self.combobox.get(), self.limit)
+
+
+class LazyTree:
+    """Fills a Treeview a page at a time as it is scrolled towards the bottom.
+
+    Pages are read with keyset pagination: fetch_page(db, after_id, limit)
+    must return up to limit rows with id > after_id, ordered by id, with the
+    id first. The id becomes the item id; show_id=False leaves it out of the
+    displayed values. count(db), if given, is reported through on_count.
+    """
+    def __init__(self, tree, scrollbar, queries, key, fetch_page, count=None, on_count=None,
+                 on_error=None, page_size=200, prefetch=0.1, show_id=True):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.queries = queries
+        self.key = key
+        self.fetch_page = fetch_page
+        self.count = count
+        self.on_count = on_count
+        self.on_error = on_error
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.show_id = show_id
+        self.active = False
+        self.loading = False
+        self.exhausted = False
+        self.last_id = 0
+
+        self.tree.configure(yscrollcommand=self.on_scroll)
+
+    def refresh(self):
+        """Re-read the rows already loaded (at least one page) and apply the changes.
+
+        Items are keyed by primary key, so only rows that were added, changed
+        or removed touch the tree, and the selection and scroll position
+        survive.
+        """
+        loaded = len(self.tree.get_children()) if self.active else 0
+        limit = max(loaded, self.page_size)
+        self.active = True
+        self.loading = True
+
+        if self.count is not None:
+            self.queries.submit(self.count, on_done=self.on_count, on_error=self.on_error, key=f"{self.key}_count")
+        self.queries.submit(
+            lambda db: self.fetch_page(db, 0, limit),
+            on_done=lambda rows: self.apply_rows(rows, limit),
+            on_error=self.page_failed,
+            key=self.key
+        )
+
+    def apply_rows(self, rows, limit):
+        if not self.active:
+            return
+        self.loading = False
+
+        # Remember the top visible row so the view does not jump
+        top = self.tree.identify_row(0)
+
+        items = {iid: self.tree.item(iid, 'values') for iid in self.tree.get_children()}
+        diff = diff_rows(items, rows, self.show_id)
+        if diff.stale:
+            self.tree.delete(*diff.stale)
+        for index, iid, values in diff.inserts:
+            self.tree.insert('', index, iid=iid, values=values)
+        for iid, values in diff.updates:
+            self.tree.item(iid, values=values)
+
+        if top and self.tree.exists(top):
+            children = self.tree.get_children()
+            self.tree.yview_moveto(self.tree.index(top) / len(children))
+
+        self.last_id = rows[-1][0] if rows else 0
+        self.exhausted = len(rows) < limit
+
+    def stop(self):
+        """Stop paging, e.g. while the tree shows search results instead."""
+        self.active = False
+        self.loading = False
+
+    def load_next_page(self):
+        if not self.active or self.loading or self.exhausted:
+            return
+        self.loading = True
+        after_id = self.last_id
+        self.queries.submit(
+            lambda db: self.fetch_page(db, after_id, self.page_size),
+            on_done=self.add_page,
+            on_error=self.page_failed,
+            key=self.key
+        )
+
+    def add_page(self, rows):
+        if not self.active:
+            return
+        self.loading = False
         for row in rows:
-            print("Inserting row:", row)  # Debug print
-            self.lesson_tree.insert('', 'end', values=row)
+            self.tree.insert('', 'end', iid=str(row[0]), values=row if self.show_id else row[1:])
+        if rows:
+            self.last_id = rows[-1][0]
+        if len(rows) < self.page_size:
+            self.exhausted = True
+
+    def page_failed(self, error):
+        # Let the next scroll try the same page again
+        self.loading = False
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Also fires when a page is added, so a tree taller than the first
+        # page keeps loading until it can scroll
+        if float(last) >= 1 - self.prefetch:
+            self.load_next_page()
+
+
+class VirtualCardList:
+    """Card list drawn on a canvas that only builds widgets for the rows in view.
+
+    build_card(parent) must return (frame, handle) and fill_card(handle, row)
+    rebinds an existing card to a new row, so a small pool of cards is reused
+    however many rows there are.
+    """
+    def __init__(self, canvas, scrollbar, build_card, fill_card, row_height=110, overscan=2):
+        self.canvas = canvas
+        self.scrollbar = scrollbar
+        self.build_card = build_card
+        self.fill_card = fill_card
+        self.row_height = row_height
+        self.overscan = overscan
+        self.rows = []
+        self.pool = []
+        self.empty_item = None
+
+        self.scrollbar.config(command=self.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.bind("<Configure>", lambda e: self.render())
+        self.bind_mousewheel(self.canvas)
+
+    def set_rows(self, rows, empty_message=""):
+        """Show a new list of rows, scrolled back to the top."""
+        self.rows = rows
+        for card in self.pool:
+            card['index'] = None
+
+        if self.empty_item is not None:
+            self.canvas.delete(self.empty_item)
+            self.empty_item = None
+        if not rows and empty_message:
+            self.empty_item = self.canvas.create_text(
+                20, 20, text=empty_message, anchor='nw', font=('Helvetica', 10, 'italic')
+            )
+
+        self.canvas.configure(scrollregion=(0, 0, 0, len(rows) * self.row_height))
+        self.canvas.yview_moveto(0)
+        self.render()
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.render()
+
+    def render(self):
+        """Bind pooled cards to the rows currently in view plus the overscan."""
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.row_height)
+        width = max(self.canvas.winfo_width() - 20, 1)
+
+        first = max(int(top // self.row_height) - self.overscan, 0)
+        last = min(int((top + height) // self.row_height) + 1 + self.overscan, len(self.rows))
+
+        while len(self.pool) < last - first:
+            self.pool.append(self.new_card())
+
+        # Cards keep the row they already show where possible, so a small
+        # scroll only rebinds the rows that came into view
+        visible = range(first, last)
+        free = [card for card in self.pool if card['index'] not in visible]
+        taken = {card['index'] for card in self.pool if card['index'] in visible}
+        for index in visible:
+            if index not in taken:
+                card = free.pop()
+                self.fill_card(card['handle'], self.rows[index])
+                card['index'] = index
+        for card in free:
+            card['index'] = None
+
+        for card in self.pool:
+            if card['index'] is None:
+                self.canvas.itemconfigure(card['window'], state='hidden')
+            else:
+                self.canvas.coords(card['window'], 10, card['index'] * self.row_height + 5)
+                self.canvas.itemconfigure(
+                    card['window'], state='normal', width=width, height=self.row_height - 10
+                )
+
+    def new_card(self):
+        frame, handle = self.build_card(self.canvas)
+        window = self.canvas.create_window(0, 0, window=frame, anchor='nw', state='hidden')
+        self.bind_mousewheel(frame)
+        for child in frame.winfo_children():
+            self.bind_mousewheel(child)
+        return {'window': window, 'handle': handle, 'index': None}
+
+    def bind_mousewheel(self, widget):
+        # Windows/macOS send <MouseWheel>, X11 sends buttons 4 and 5
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            widget.bind(sequence, self.on_mousewheel)
+
+    def on_mousewheel(self, event):
+        step = -1 if event.num == 4 or event.delta > 0 else 1
+        self.yview('scroll', step, 'units')
 
 
 class LoadingScreen:
@@ -1426,25 +2377,25 @@ class LoadingScreen:
         self.progress_frame = tk.Frame(self.loading_window, bg='#ffffff')
         self.progress_frame.pack(fill='x', padx=20, pady=(0, 20))
         
-        # Load and display animated GIF
+        # Load and display animated GIF. Frames are decoded one at a time as
+        # they are shown, so only the first is decoded before the splash appears
+        # and only the one on screen is held in memory.
+        self.animation = None
         try:
-            # Load GIF using PIL
-            self.image_frames = []
-            gif = Image.open("loading.gif")  # Make sure the GIF exists
-            for frame in range(gif.n_frames):
-                gif.seek(frame)
-                frame_image = ImageTk.PhotoImage(gif.copy())
-                self.image_frames.append(frame_image)
+            self.gif = Image.open("loading.gif")  # Make sure the GIF exists
+            self.frame_count = getattr(self.gif, 'n_frames', 1)
             self.current_frame = 0
+            self.frame_image = ImageTk.PhotoImage(self.gif.copy())
         except Exception as e:
-            print(f"Error loading GIF: {e}")
+            log.warning("Error loading GIF: %s", e)
             # Fallback to a static image
-            self.image_frames = [tk.PhotoImage(width=200, height=200)]
-            self.current_frame = 0
-            
-        self.image_label = tk.Label(self.image_frame, image=self.image_frames[self.current_frame], bg='#ffffff')
+            self.gif = None
+            self.frame_image = tk.PhotoImage(width=200, height=200)
+
+        self.image_label = tk.Label(self.image_frame, image=self.frame_image, bg='#ffffff')
         self.image_label.pack(pady=10)
-        self.animate_gif()  # Start animation
+        if self.gif is not None and self.frame_count > 1:
+            self.schedule_next_frame()  # Start animation
         
         # Add title
         self.title_label = tk.Label(
@@ -1474,29 +2425,43 @@ class LoadingScreen:
         )
         self.progress.pack(fill='x', pady=10)
         
-        # Start progress
-        self.progress_value = 0
-        self.update_progress()
+
+    def schedule_next_frame(self):
+        # Each frame stays up for its own duration from the GIF, 100 ms if unset
+        duration = self.gif.info.get('duration') or 100
+        self.animation = self.loading_window.after(duration, self.animate_gif)
 
     def animate_gif(self):
-        """Animate the GIF by looping through frames."""
-        if self.image_frames:
-            self.current_frame = (self.current_frame + 1) % len(self.image_frames)
-            self.image_label.config(image=self.image_frames[self.current_frame])
-            self.loading_window.after(20, self.animate_gif)  # Change frame every 100ms
-
-    def update_progress(self):
-        if self.progress_value < 100:
-            self.progress_value += 2
-            self.progress['value'] = self.progress_value
-            self.loading_window.after(40, self.update_progress)  # Update every 40ms
-        else:
-            self.loading_window.after(500, self.show_main_window)  # Wait 0.5s before showing main window
+        """Decode and show the next frame of the GIF."""
+        self.animation = None
+        if not self.loading_window.winfo_exists():
+            return
+        self.current_frame = (self.current_frame + 1) % self.frame_count
+        self.gif.seek(self.current_frame)
+        self.frame_image = ImageTk.PhotoImage(self.gif.copy())
+        self.image_label.config(image=self.frame_image)
+        self.schedule_next_frame()
+
+    def set_progress(self, value, text):
+        # Startup work runs on the main loop, so let the splash screen draw
+        # and animate before it carries on
+        self.progress['value'] = value
+        self.loading_label.config(text=text)
+        self.loading_window.update()
     
     def show_main_window(self):
-        self.loading_window.destroy()  # Close loading window
+        self.close()
         self.root.deiconify()  # Show main window
 
+    def close(self):
+        # Stop the animation before its window goes
+        if self.animation is not None:
+            self.loading_window.after_cancel(self.animation)
+            self.animation = None
+        if self.gif is not None:
+            self.gif.close()
+        self.loading_window.destroy()  # Close loading window
+
 def show_loading_screen(root):
         loading = LoadingScreen(root)
         return loading
@@ -1504,6 +2469,7 @@ def show_loading_screen(root):
 
  
 def main():
+    setup_logging()
     root = tk.Tk()
     app = DrivingSchoolApp(root)
     root.mainloop()